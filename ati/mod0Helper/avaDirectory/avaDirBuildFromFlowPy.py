@@ -11,7 +11,8 @@
 #
 # Outputs :
 #     - 11_avaDirectoryData/com4_*/
-#           com4_<scenario>/praID*.geojson
+#           com4_<scenario>/praID*.geojson (or .fgb/.gpkg, see singleAvaDriver;
+#           one praIDs.gpkg with singleAvaLayout = singleGPKG)
 #           runout rasters (e.g. fpTravel, fpMax, thickness …)
 #           avaDirectory.csv (global metadata index)
 #
@@ -41,19 +42,22 @@
 # ----------------------------------------------------------------------- #
 
 import os
+import re
 import glob
+import json
 import shutil
 import logging
+import subprocess
 import warnings
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
 import numpy as np
 import pandas as pd
 import geopandas as gpd
+import shapely
 import rasterio
 from rasterio.mask import mask
-import fiona
 
 import ati.mod0Helper.dataUtils as dataUtils
 from ati.mod0Helper.dataUtils import relPath
@@ -74,6 +78,23 @@ tqdm = partial(
 )
 
 
+# all praIDs of a scenario in one layer (singleAvaLayout = singleGPKG)
+SINGLE_GPKG_NAME = "praIDs.gpkg"
+# written last by _processOneScenario; a com4_* folder without it was interrupted
+SCENARIO_MANIFEST_NAME = "step13Manifest.json"
+# Step 13 flags a scenario's outputs depend on (recorded in the manifest)
+_MANIFEST_FLAGS = (
+    "writeScenarioParquet",
+    "writeSingleAvaGeoJSON",
+    "doSplit",
+    "doMergeReljson",
+    "doEnrich",
+    "doExtractMetadata",
+    "doClipRasters",
+    "singleAvaDriver",
+    "singleAvaLayout",
+)
+
 warnings.filterwarnings("ignore", category=UserWarning)
 log = logging.getLogger(__name__)
 logging.getLogger("pyogrio").setLevel(logging.WARNING)
@@ -114,11 +135,37 @@ def runAvaDirBuildFromFlowPy(cfg, workFlowDir):
     doClipRasters = avaCfg.getboolean("doClipRasters", True)
     doCollectSingleAva = avaCfg.getboolean("doCollectSingleAva", True)
     maxClipWorkers = avaCfg.getint("maxClipWorkers", 4)
+    clipPoolType = avaCfg.get("clipPoolType", fallback="process").strip().lower()
+    if clipPoolType not in ("thread", "process"):
+        log.warning("Step 13: unknown clipPoolType '%s'; using thread", clipPoolType)
+        clipPoolType = "thread"
+    clipCompress = avaCfg.get("clipCompress", fallback="ZSTD").strip().upper()
+    if clipCompress not in CLIP_COMPRESSIONS:
+        log.warning("Step 13: unknown clipCompress '%s'; using ZSTD", clipCompress)
+        clipCompress = "ZSTD"
+    clipOptions = _clipCreationOptions(
+        clipCompress,
+        zstdLevel=avaCfg.getint("clipZstdLevel", 9),
+        lercMaxError=avaCfg.getfloat("lercMaxError", 0.0),
+    )
+    parallelScenarios = avaCfg.getboolean("parallelScenarios", True)
+    maxScenarioWorkers = avaCfg.getint("maxScenarioWorkers", max(1, (os.cpu_count() or 1) - 1))
     subcatchmentThreshold = cfg["praSUBCATCHMENTS"].getint("streamThreshold", fallback=500)
 
     # --- New: output mode flags ---
     writeSingleAvaGeoJSON = avaCfg.getboolean("writeSingleAvaGeoJSON", True)
     writeScenarioParquet = avaCfg.getboolean("writeScenarioParquet", False)
+    singleAvaDriver = avaCfg.get("singleAvaDriver", fallback="GeoJSON").strip()
+    forceRebuildScenarios = avaCfg.getboolean("forceRebuildScenarios", False)
+    collectMethod = avaCfg.get("collectMethod", fallback="copy").strip().lower()
+    if collectMethod not in ("copy", "hardlink", "reflink"):
+        log.warning("Step 13: unknown collectMethod '%s'; using copy", collectMethod)
+        collectMethod = "copy"
+    dataUtils.vectorExtension(singleAvaDriver)  # fail early on unsupported drivers
+    singleAvaLayout = avaCfg.get("singleAvaLayout", fallback="files").strip()
+    if singleAvaLayout not in ("files", "singleGPKG"):
+        log.warning("Step 13: unknown singleAvaLayout '%s'; using files", singleAvaLayout)
+        singleAvaLayout = "files"
 
     log.info(
         "Step 13: Flags → doProcess=%s, doSplit=%s, doClipRasters=%s, maxClipWorkers=%d",
@@ -163,96 +210,209 @@ def runAvaDirBuildFromFlowPy(cfg, workFlowDir):
         len(tasks),
     )
 
-    lastPraDir = None
-    for praDir, flowChoice, outputsDir in tqdm(
-        tasks,
-        desc="Step 13: FlowPy → AvaDir",
-        unit="com4",
-    ):
-        if praDir is not None and praDir != lastPraDir:
-            log.info("Step 13: Processing %s", relPath(praDir, cairosDir))
-            lastPraDir = praDir
-
-        gdf, targetDir, resId = (None, None, None)
-        if doProcess:
-            gdf, targetDir, resId = processScenario(outputsDir, cairosDir)
-            if gdf is None:
-                continue
+    opts = dict(
+        cairosDir=cairosDir,
+        doProcess=doProcess,
+        doSplit=doSplit,
+        doMergeReljson=doMergeReljson,
+        doEnrich=doEnrich,
+        doExtractMetadata=doExtractMetadata,
+        doClipRasters=doClipRasters,
+        maxClipWorkers=maxClipWorkers,
+        clipPoolType=clipPoolType,
+        clipOptions=clipOptions,
+        subcatchmentThreshold=subcatchmentThreshold,
+        writeSingleAvaGeoJSON=writeSingleAvaGeoJSON,
+        writeScenarioParquet=writeScenarioParquet,
+        singleAvaDriver=singleAvaDriver,
+        singleAvaLayout=singleAvaLayout,
+        forceRebuildScenarios=forceRebuildScenarios,
+    )
 
-        reljsonPath = _findRelJson(outputsDir)
+    if parallelScenarios and maxScenarioWorkers > 1 and len(tasks) > 1:
+        # scenarios write to their own com4_<resId> folders → independent tasks
+        log.info("Step 13: Processing scenarios on %d worker processes", maxScenarioWorkers)
+        # scenarios already fill the cores → no nested clip process pools per scenario
+        opts["clipPoolType"] = "thread"
+        with ProcessPoolExecutor(max_workers=maxScenarioWorkers) as ex:
+            futures = [ex.submit(_processOneScenario, task, opts) for task in tasks]
+            for fut in tqdm(
+                as_completed(futures),
+                total=len(futures),
+                desc="Step 13: FlowPy → AvaDir",
+                unit="com4",
+            ):
+                fut.result()
+    else:
+        lastPraDir = None
+        for task in tqdm(
+            tasks,
+            desc="Step 13: FlowPy → AvaDir",
+            unit="com4",
+        ):
+            praDir = task[0]
+            if praDir is not None and praDir != lastPraDir:
+                log.info("Step 13: Processing %s", relPath(praDir, cairosDir))
+                lastPraDir = praDir
+            _processOneScenario(task, opts)
 
-        # --- Big-data mode: build one scenario table (res/rel rows per praID) and write GeoParquet ---
-        if writeScenarioParquet:
-            try:
-                scenGdf = buildScenarioGdf(
-                    gdf_res=gdf,
-                    reljsonPath=reljsonPath,
-                    doMergeReljson=doMergeReljson,
+    # --- Collect to Library directory (copies com4_* folders) ---
+    if doCollectSingleAva:
+        collectSingleAvaDirs(
+            baseDir,
+            avaDirData,
+            avaDirLib,
+            cairosDir,
+            singleAvaDriver,
+            collectMethod,
+            singleAvaLayout,
+        )
+
+    log.info("Step 13: AvaDirectory build complete.")
+
+
+# ------------------ Function: _processOneScenario ------------------ #
+def _processOneScenario(task, opts):
+    """Process one com4FlowPy output folder into its com4_<resId> AvaDirectory folder.
+
+    ``opts`` is a plain dict of the Step 13 flags (pickled to worker processes).
+    Returns the resId, or None if the scenario had no results.
+    """
+    _, _, outputsDir = task
+    cairosDir = opts["cairosDir"]
+    doMergeReljson = opts["doMergeReljson"]
+    doEnrich = opts["doEnrich"]
+    doExtractMetadata = opts["doExtractMetadata"]
+    doClipRasters = opts["doClipRasters"]
+    subcatchmentThreshold = opts["subcatchmentThreshold"]
+    writeSingleAvaGeoJSON = opts["writeSingleAvaGeoJSON"]
+
+    gdf, targetDir, resId = (None, None, None)
+    if opts["doProcess"]:
+        if not opts["forceRebuildScenarios"] and _scenarioUpToDate(outputsDir, opts):
+            log.info("Step 13: Up to date, skipping %s", relPath(outputsDir, cairosDir))
+            return None
+        gdf, targetDir, resId = processScenario(outputsDir, cairosDir)
+        if gdf is None:
+            return None
+        # outputs are about to change → invalidate until this run completes
+        manifestPath = os.path.join(targetDir, SCENARIO_MANIFEST_NAME)
+        if os.path.exists(manifestPath):
+            os.remove(manifestPath)
+    nPraIDs = 0
+    clipComplete = False
+
+    reljsonPath = _findRelJson(outputsDir)
+
+    # --- Big-data mode: build one scenario table (res/rel rows per praID) and write GeoParquet ---
+    if opts["writeScenarioParquet"]:
+        try:
+            scenGdf = buildScenarioGdf(
+                gdf_res=gdf,
+                reljsonPath=reljsonPath,
+                doMergeReljson=doMergeReljson,
+                resId=resId,
+                doEnrich=doEnrich,
+                doExtractMetadata=doExtractMetadata,
+                outputsDir=outputsDir,
+                cairosDir=cairosDir,
+                subcatchmentThreshold=subcatchmentThreshold,
+            )
+
+            outName = f"avaScenLeaf_com4_{resId}.parquet"
+            outParquet = os.path.join(targetDir, outName)
+
+            scenGdf.to_parquet(outParquet, index=False)
+            log.info(
+                "Step 13: Wrote scenario parquet → %s",
+                relPath(outParquet, cairosDir),
+            )
+        except Exception:
+            log.exception(
+                "Step 13: Failed to write scenario parquet for %s",
+                relPath(outputsDir, cairosDir),
+            )
+
+    # --- Legacy mode: split into many praID* files (GeoJSON or singleAvaDriver) ---
+    singleAvaDriver = opts["singleAvaDriver"]
+    singleAvaLayout = opts["singleAvaLayout"]
+    if writeSingleAvaGeoJSON and opts["doSplit"] and gdf is not None:
+        praFiles = splitGeojsonByPraId(
+            gdf,
+            targetDir,
+            reljsonPath,
+            doMergeReljson,
+            cairosDir,
+            driver=singleAvaDriver,
+            layout=singleAvaLayout,
+        )
+        # the same normalized integer keys the split writes one praID per
+        praKeys = _praIdKeys(gdf)
+        if praKeys is not None:
+            nPraIDs = int(praKeys.nunique())
+
+        if doEnrich or doExtractMetadata:
+            for pf in praFiles:
+                _enrichAndAttach(
+                    pf,
                     resId=resId,
+                    cairosDir=cairosDir,
                     doEnrich=doEnrich,
                     doExtractMetadata=doExtractMetadata,
-                    outputsDir=outputsDir,
-                    cairosDir=cairosDir,
                     subcatchmentThreshold=subcatchmentThreshold,
                 )
 
-                outName = f"avaScenLeaf_com4_{resId}.parquet"
-                outParquet = os.path.join(targetDir, outName)
+        if doClipRasters:
+            clipComplete = clipRastersByMasks(
+                maskDir=targetDir,
+                outputsDir=outputsDir,
+                outputDir=targetDir,
+                cairosDir=cairosDir,
+                max_workers=opts["maxClipWorkers"],
+                poolType=opts["clipPoolType"],
+                creationOptions=opts["clipOptions"],
+                driver=singleAvaDriver,
+                layout=singleAvaLayout,
+            )
 
-                scenGdf.to_parquet(outParquet, index=False)
-                log.info(
-                    "Step 13: Wrote scenario parquet → %s",
-                    relPath(outParquet, cairosDir),
-                )
-            except Exception:
-                log.exception(
-                    "Step 13: Failed to write scenario parquet for %s",
-                    relPath(outputsDir, cairosDir),
-                )
+    # If we are NOT writing singleAva GeoJSONs, raster clipping has no masks to use → skip
+    if (not writeSingleAvaGeoJSON) and doClipRasters:
+        log.info(
+            "Step 13: doClipRasters=True but writeSingleAvaGeoJSON=False → skipping raster clipping (no masks)."
+        )
 
-        # --- Legacy mode: split into many praID*.geojson ---
-        if writeSingleAvaGeoJSON and doSplit and gdf is not None:
-            splitGeojsonByPraId(gdf, targetDir, reljsonPath, doMergeReljson, cairosDir)
-
-            if doEnrich or doExtractMetadata:
-                for pf in glob.glob(os.path.join(targetDir, "praID*.geojson")):
-                    if doEnrich:
-                        enrichAvalancheFeature(pf, resId=resId, cairosDir=cairosDir)
-                    if doExtractMetadata:
-                        _attachScenarioMetadata(pf, cairosDir, subcatchmentThreshold)
-
-            if doClipRasters:
-                clipRastersByMasks(
-                    maskDir=targetDir,
-                    outputsDir=outputsDir,
-                    outputDir=targetDir,
-                    cairosDir=cairosDir,
-                    max_workers=maxClipWorkers,
-                )
+    if targetDir is not None:
+        _writeScenarioManifest(targetDir, opts, nPraIDs, clipComplete)
+    return resId
 
-        # If we are NOT writing singleAva GeoJSONs, raster clipping has no masks to use → skip
-        if (not writeSingleAvaGeoJSON) and doClipRasters:
-            log.info(
-                "Step 13: doClipRasters=True but writeSingleAvaGeoJSON=False → skipping raster clipping (no masks)."
-            )
 
-    # --- Collect to Library directory (copies com4_* folders) ---
-    if doCollectSingleAva:
-        collectSingleAvaDirs(baseDir, avaDirData, avaDirLib, cairosDir)
+def _clippedRasters(mapDir):
+    """Clipped rasters of a com4_* folder (praID<maskName>_<raster>.tif, maskName = praID<k>)."""
+    return [n for n in os.listdir(mapDir) if n.startswith("praIDpraID") and n.endswith(".tif")]
 
-    log.info("Step 13: AvaDirectory build complete.")
+
+def _writeScenarioManifest(mapDir, opts, nPraIDs, clipComplete):
+    """Record that a scenario finished: praID count, clip outputs and the flags used."""
+    manifest = {
+        "nPraIDs": nPraIDs,
+        "clipComplete": clipComplete,
+        "nClipped": len(_clippedRasters(mapDir)),
+        "flags": {k: opts[k] for k in _MANIFEST_FLAGS},
+    }
+    try:
+        with open(os.path.join(mapDir, SCENARIO_MANIFEST_NAME), "w") as fh:
+            json.dump(manifest, fh, indent=2)
+    except OSError:
+        log.exception("Step 13: Failed to write manifest in %s", relPath(mapDir, opts["cairosDir"]))
 
 
 # ------------------ Function: processScenario ------------------ #
-def processScenario(outputsDir, cairosDir):
-    """Locate com4FlowPy results and return (gdf, targetDir, resId)."""
+def _locateScenario(outputsDir):
+    """Return (pathPolygons.geojson, com4_<resId> target folder, resId), or Nones if absent."""
     geojsonFiles = glob.glob(
         os.path.join(outputsDir, "peakFiles", "res_*", "*_pathPolygons.geojson")
     )
     if not geojsonFiles:
-        log.warning(
-            "No pathPolygons.geojson found in %s", relPath(outputsDir, cairosDir)
-        )
         return None, None, None
 
     geojsonPath = geojsonFiles[0]
@@ -260,6 +420,61 @@ def processScenario(outputsDir, cairosDir):
     resId = os.path.basename(resFolder).replace("res_", "")
     flowDir = os.path.dirname(os.path.dirname(outputsDir))
     mapDir = os.path.join(flowDir, "Map", "singleAvaDir", f"com4_{resId}")
+    return geojsonPath, mapDir, resId
+
+
+def _scenarioUpToDate(outputsDir, opts):
+    """True if a scenario completed with the current flags and its outputs are newer than its results.
+
+    A completed run leaves a manifest (praID count, clip state, flags); the praID files
+    and clipped rasters it recorded must still be there.
+    """
+    geojsonPath, mapDir, resId = _locateScenario(outputsDir)
+    if geojsonPath is None or not os.path.isdir(mapDir):
+        return False
+    manifestPath = os.path.join(mapDir, SCENARIO_MANIFEST_NAME)
+    outputs = [manifestPath]
+    if opts["writeScenarioParquet"]:
+        outputs.append(os.path.join(mapDir, f"avaScenLeaf_com4_{resId}.parquet"))
+    praFiles = []
+    if opts["writeSingleAvaGeoJSON"] and opts["doSplit"]:
+        praPattern = singleAvaPattern(opts["singleAvaDriver"], opts["singleAvaLayout"])
+        praFiles = glob.glob(os.path.join(mapDir, praPattern))
+        outputs.extend(praFiles)
+    if not dataUtils.outputsUpToDate(outputs, [geojsonPath]):
+        return False
+
+    try:
+        with open(manifestPath) as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        return False
+    if manifest.get("flags") != {k: opts[k] for k in _MANIFEST_FLAGS}:
+        return False
+    if opts["writeSingleAvaGeoJSON"] and opts["doSplit"]:
+        nExpected = manifest.get("nPraIDs", -1)
+        if opts["singleAvaLayout"] == "singleGPKG":
+            if nExpected and not praFiles:
+                return False
+        elif len(praFiles) != nExpected:
+            return False
+        if opts["doClipRasters"] and (
+            not manifest.get("clipComplete")
+            or len(_clippedRasters(mapDir)) < manifest.get("nClipped", 0)
+        ):
+            return False
+    return True
+
+
+def processScenario(outputsDir, cairosDir):
+    """Locate com4FlowPy results and return (gdf, targetDir, resId)."""
+    geojsonPath, mapDir, resId = _locateScenario(outputsDir)
+    if geojsonPath is None:
+        log.warning(
+            "No pathPolygons.geojson found in %s", relPath(outputsDir, cairosDir)
+        )
+        return None, None, None
+
     os.makedirs(mapDir, exist_ok=True)
 
     try:
@@ -298,9 +513,9 @@ def buildScenarioGdf(
 
     # --- extract key from res ---
     if "praID" in gdf_res.columns:
-        gdf_res["_key"] = gdf_res["praID"].apply(_extract_int_like)
+        gdf_res["_key"] = _extract_int_keys(gdf_res["praID"])
     elif "PRA_id" in gdf_res.columns:
-        gdf_res["_key"] = gdf_res["PRA_id"].apply(_extract_int_like)
+        gdf_res["_key"] = _extract_int_keys(gdf_res["PRA_id"])
     else:
         raise ValueError("No PRA_id/praID column in FlowPy results.")
 
@@ -318,9 +533,9 @@ def buildScenarioGdf(
         rel_gdf = _normalize_ids(rel_gdf)
 
         if "praID" in rel_gdf.columns:
-            rel_gdf["_key"] = rel_gdf["praID"].apply(_extract_int_like)
+            rel_gdf["_key"] = _extract_int_keys(rel_gdf["praID"])
         elif "PRA_id" in rel_gdf.columns:
-            rel_gdf["_key"] = rel_gdf["PRA_id"].apply(_extract_int_like)
+            rel_gdf["_key"] = _extract_int_keys(rel_gdf["PRA_id"])
         else:
             log.warning(
                 "RELJSON %s has no praID/PRA_id column → skipping merge.",
@@ -347,21 +562,15 @@ def buildScenarioGdf(
                 if col not in res_first.columns and col in rel_first.columns:
                     res_first[col] = None
 
+            # fill missing res values from the rel row of the same key
             rel_map = rel_first.set_index("_key")
-
-            for idx, row in res_first.iterrows():
-                k = row["_key"]
-                if k not in rel_map.index:
-                    continue
-                for col in union_cols:
-                    if col in ("geometry", "PRA_id", "Sector"):
-                        continue
-                    if col in rel_map.columns:
-                        val = (
-                            res_first.at[idx, col] if col in res_first.columns else None
-                        )
-                        if val is None or (isinstance(val, float) and np.isnan(val)):
-                            res_first.at[idx, col] = rel_map.at[k, col]
+            fillCols = [
+                c for c in sorted(union_cols) if c in rel_map.columns and res_first[c].isna().any()
+            ]
+            rel_aligned = rel_map[fillCols].reindex(res_first["_key"].to_numpy())
+            filled = res_first[fillCols].combine_first(rel_aligned.set_axis(res_first.index))
+            for col in fillCols:
+                res_first[col] = filled[col]
 
     # --- drop legacy helper cols ---
     for df in (res_first, rel_first):
@@ -374,6 +583,8 @@ def buildScenarioGdf(
     if rel_first is not None and not rel_first.empty:
         combined.append(rel_first)
 
+    # arrow-backed attribute columns: cheaper concat and no object round-trip in to_parquet
+    combined = [_to_arrow_dtypes(df) for df in combined]
     out = gpd.GeoDataFrame(pd.concat(combined, ignore_index=True), crs=res_first.crs)
 
     # --- enrich + metadata (scenario-wide, no per-file I/O) ---
@@ -392,64 +603,84 @@ def buildScenarioGdf(
     return out
 
 
-def _attachScenarioMetadataToGdf(
-    gdf: gpd.GeoDataFrame,
-    outputsDir: str,
-    subcatchmentThreshold: int | None = None,
-) -> None:
-    """Attach scenario metadata based on folder path (same logic as per-file extraction)."""
-    import re
+# scenario path tokens, e.g. pra030_subC500_secN_1800-2400-3/Size2/dry/...
+_RE_SUBC = re.compile(r"subC(\d+)")
+_RE_SEC = re.compile(r"sec([NESW])")
+_RE_ELEV = re.compile(r"(\d{4})-(\d{4,5})")
+_RE_PPM = re.compile(r"-(\d)(?:/|$)")
+_RE_SIZE = re.compile(r"Size(\d)")
 
-    path = str(outputsDir).replace("\\", "/")
 
-    m = re.search(r"subC(\d+)", path)
+def _scenarioMetadataFromPath(path, subcatchmentThreshold=None):
+    """Scenario metadata columns (subC, sector, elevation band, flow, ppm/pem, rSize) parsed from a path."""
+    path = str(path).replace("\\", "/")
+
+    m = _RE_SUBC.search(path)
     subC = (
         subcatchmentThreshold
         if subcatchmentThreshold is not None
         else (int(m.group(1)) if m else None)
     )
-    sector = next((s for s in ["N", "E", "S", "W"] if f"sec{s}" in path), None)
-    m = re.search(r"(\d{4})-(\d{4,5})", path)
+    m = _RE_SEC.search(path)
+    sector = m.group(1) if m else None
+    m = _RE_ELEV.search(path)
     elevMin, elevMax = (int(m.group(1)), int(m.group(2))) if m else (None, None)
     flow = "dry" if "/dry/" in path else "wet" if "/wet/" in path else None
-    m = re.search(r"-(\d)(?:/|$)", path)
+    m = _RE_PPM.search(path)
     ppm = int(m.group(1)) if m else None
-    m = re.search(r"Size(\d)", path)
+    m = _RE_SIZE.search(path)
     pem = int(m.group(1)) if m else None
     rSize = None
     if ppm is not None and pem is not None:
         diff = ppm - pem
         rSize = max(1, 5 - diff)
 
-    gdf["subC"] = subC
-    gdf["sector"] = sector
-    gdf["elevMin"] = elevMin
-    gdf["elevMax"] = elevMax
-    gdf["flow"] = flow
-    gdf["ppm"] = ppm
-    gdf["pem"] = pem
-    gdf["rSize"] = rSize
+    return {
+        "subC": subC,
+        "sector": sector,
+        "elevMin": elevMin,
+        "elevMax": elevMax,
+        "flow": flow,
+        "ppm": ppm,
+        "pem": pem,
+        "rSize": rSize,
+    }
+
+
+def _attachScenarioMetadataToGdf(
+    gdf: gpd.GeoDataFrame,
+    outputsDir: str,
+    subcatchmentThreshold: int | None = None,
+) -> None:
+    """Attach scenario metadata based on folder path (same logic as per-file extraction)."""
+    for col, val in _scenarioMetadataFromPath(outputsDir, subcatchmentThreshold).items():
+        gdf[col] = val
 
 
-# ------------------ Legacy: splitGeojsonByPraId (unchanged) ------------------ #
+# ------------------ Function: splitGeojsonByPraId (per-praID files or one GeoPackage) ------------------ #
 def splitGeojsonByPraId(
-    gdf_res, targetDir, reljsonPath=None, doMergeReljson=True, cairosDir=None
+    gdf_res,
+    targetDir,
+    reljsonPath=None,
+    doMergeReljson=True,
+    cairosDir=None,
+    driver="GeoJSON",
+    layout="files",
 ):
+    """Write one praID<k> file per PRA id into ``targetDir``; returns the written paths.
+
+    With ``layout="singleGPKG"`` all praIDs go into one praIDs.gpkg layer instead.
+    """
     if gdf_res is None or gdf_res.empty:
         log.warning("Nothing to split in %s", relPath(targetDir, cairosDir))
-        return
+        return []
 
     gdf_res = _normalize_ids(gdf_res)
-    key_series = None
-    if "praID" in gdf_res.columns:
-        key_series = gdf_res["praID"].apply(_extract_int_like)
-    elif "PRA_id" in gdf_res.columns:
-        key_series = gdf_res["PRA_id"].apply(_extract_int_like)
-    else:
+    key_series = _praIdKeys(gdf_res)
+    if key_series is None:
         log.warning("No PRA_id/praID column in %s", relPath(targetDir, cairosDir))
-        return
+        return []
 
-    keys = sorted({k for k in key_series.tolist() if k is not None})
     rel_lookup = {}
     if doMergeReljson and reljsonPath and os.path.isfile(reljsonPath):
         try:
@@ -468,10 +699,8 @@ def splitGeojsonByPraId(
                 rel_key = None
 
             if rel_key is not None:
-                reljson_gdf["_key"] = rel_key.apply(_extract_int_like)
+                reljson_gdf["_key"] = _extract_int_keys(rel_key)
                 for k, idx in reljson_gdf.groupby("_key").groups.items():
-                    if k is None:
-                        continue
                     rel_lookup[k] = reljson_gdf.loc[idx].copy()
 
                 log.info("RELJSON merged: %d keyed release features.", len(rel_lookup))
@@ -479,29 +708,41 @@ def splitGeojsonByPraId(
             log.exception("Failed to read RELJSON %s", relPath(reljsonPath, cairosDir))
 
     gdf_res["_key"] = key_series
-    for k in keys:
+    # first res feature per key in one groupby instead of one boolean scan per key
+    res_heads = (
+        gdf_res.dropna(subset=["_key"])
+        .groupby("_key", sort=False)
+        .head(1)
+        .sort_values("_key", kind="stable")
+    )
+    writtenPaths = []
+    frames = []
+    for pos, k in enumerate(res_heads["_key"].tolist()):
         try:
-            res_feat = gdf_res[gdf_res["_key"] == k].iloc[[0]].copy()
+            res_feat = res_heads.iloc[[pos]].copy()
             res_feat["praID"] = int(k)
             res_feat["modType"] = "res"
 
             if k in rel_lookup:
                 rel_feat = rel_lookup[k].iloc[[0]].copy()
+                # praID on the rel row too: the praIDs.gpkg layout groups its masks by it
+                rel_feat["praID"] = int(k)
                 rel_feat["modType"] = "rel"
 
                 rel_cols = set(rel_feat.columns)
                 res_cols = set(res_feat.columns)
                 union_cols = (rel_cols | res_cols) - {"geometry", "PRA_id", "Sector"}
 
-                for col in sorted(union_cols):
-                    if col not in res_feat.columns and col in rel_feat.columns:
-                        res_feat[col] = rel_feat.iloc[0].get(col)
-                    elif col in res_feat.columns and col in rel_feat.columns:
-                        val = res_feat.iloc[0].get(col)
-                        if val is None or (isinstance(val, float) and np.isnan(val)):
-                            res_feat.loc[res_feat.index[0], col] = rel_feat.iloc[0].get(
-                                col
-                            )
+                # missing or null res values are taken from the rel feature
+                rel_row = rel_feat.set_axis(res_feat.index)
+                sharedCols = [
+                    c for c in sorted(union_cols & rel_cols & res_cols) if res_feat[c].isna().any()
+                ]
+                filled = res_feat[sharedCols].combine_first(rel_row[sharedCols])
+                for col in sharedCols:
+                    res_feat[col] = filled[col]
+                for col in sorted((union_cols & rel_cols) - res_cols):
+                    res_feat[col] = rel_row[col]
 
                 combined = gpd.GeoDataFrame(
                     pd.concat([res_feat, rel_feat], ignore_index=True), crs=res_feat.crs
@@ -514,204 +755,432 @@ def splitGeojsonByPraId(
             ]
             combined = combined.drop(columns=drop_cols, errors="ignore")
 
-            outPath = os.path.join(targetDir, f"praID{k}.geojson")
-            dataUtils.writeGeoData(combined, outPath)
+            if layout == "singleGPKG":
+                frames.append(combined)
+                continue
+            writtenPaths.append(
+                dataUtils.writeVector(combined, os.path.join(targetDir, f"praID{k}"), driver=driver)
+            )
         except Exception:
             log.exception("Failed to split/write praID%s", k)
 
-
-def enrichAvalancheFeature(praFile, resId=None, cairosDir=None):
+    if frames:
+        # one OGR session for the whole scenario instead of one file per praID
+        outPath = os.path.join(targetDir, SINGLE_GPKG_NAME)
+        try:
+            dataUtils.writeGeoData(
+                gpd.GeoDataFrame(pd.concat(frames, ignore_index=True), crs=frames[0].crs),
+                outPath,
+                driver="GPKG",
+            )
+            writtenPaths.append(outPath)
+        except Exception:
+            log.exception("Failed to write %s", relPath(outPath, cairosDir))
+    return writtenPaths
+
+
+def _enrichGdf(gdf, resId=None):
+    gdf = _normalize_ids(gdf)
+    if "modType" not in gdf.columns and len(gdf) == 2:
+        gdf.loc[gdf.index[0], "modType"] = "res"
+        gdf.loc[gdf.index[1], "modType"] = "rel"
+    if resId is not None:
+        gdf["resultID"] = str(resId)
+    return gdf
+
+
+def _enrichAndAttach(
+    praFile,
+    resId=None,
+    cairosDir=None,
+    doEnrich=True,
+    doExtractMetadata=True,
+    subcatchmentThreshold=None,
+):
+    """Enrich and/or attach scenario metadata to a praID file in one read/write pass."""
     if not os.path.exists(praFile):
         return
     try:
         gdf = dataUtils.readGeoData(praFile)
-        gdf = _normalize_ids(gdf)
-        if "modType" not in gdf.columns and len(gdf) == 2:
-            gdf.loc[gdf.index[0], "modType"] = "res"
-            gdf.loc[gdf.index[1], "modType"] = "rel"
-        if resId is not None:
-            gdf["resultID"] = str(resId)
+        if doEnrich:
+            gdf = _enrichGdf(gdf, resId)
+        if doExtractMetadata:
+            for col, val in _scenarioMetadataFromPath(praFile, subcatchmentThreshold).items():
+                gdf[col] = val
         dataUtils.writeGeoData(gdf, praFile)
     except Exception:
-        log.exception(
-            "Failed to enrich avalanche feature %s", relPath(praFile, cairosDir)
-        )
+        log.exception("Failed to enrich/attach metadata for %s", relPath(praFile, cairosDir))
+
+
+def enrichAvalancheFeature(praFile, resId=None, cairosDir=None):
+    _enrichAndAttach(praFile, resId=resId, cairosDir=cairosDir, doExtractMetadata=False)
 
 
 def _attachScenarioMetadata(praFile, cairosDir, subcatchmentThreshold=None):
-    import re
+    _enrichAndAttach(
+        praFile,
+        cairosDir=cairosDir,
+        doEnrich=False,
+        subcatchmentThreshold=subcatchmentThreshold,
+    )
+
+
+# GTiff compressions accepted for clipped rasters (clipCompress)
+CLIP_COMPRESSIONS = ("ZSTD", "LERC", "LERC_ZSTD", "DEFLATE", "LZW")
+
+
+def _clipCreationOptions(compress="ZSTD", zstdLevel=9, lercMaxError=0.0):
+    """GTiff creation options of the clipped rasters (tiled 256x256, ZSTD/LERC/...)."""
+    options = dict(compress=compress, tiled=True, blockxsize=256, blockysize=256)
+    if compress in ("ZSTD", "LERC_ZSTD"):
+        options["zstd_level"] = zstdLevel
+    if compress.startswith("LERC"):
+        # 0.0 = lossless; > 0 allows this absolute error per pixel
+        options["max_z_error"] = lercMaxError
+    return options
 
+
+def _clip_one_raster(
+    rasterFile, maskList, maskIndex, outputDir, cairosDir, creationOptions=None, existing=None
+):
+    """Clip one raster by the masks it touches; returns (written, failed) with failed 0 or 1."""
+    # existing: file names already in outputDir (one listdir instead of a stat per mask)
+    if existing is None:
+        existing = set(os.listdir(outputDir))
+    done = 0
     try:
-        gdf_pf = dataUtils.readGeoData(praFile)
-        path = str(praFile).replace("\\", "/")
-
-        m = re.search(r"subC(\d+)", path)
-        subC = (
-            subcatchmentThreshold
-            if subcatchmentThreshold is not None
-            else (int(m.group(1)) if m else None)
-        )
-        sector = next((s for s in ["N", "E", "S", "W"] if f"sec{s}" in path), None)
-        m = re.search(r"(\d{4})-(\d{4,5})", path)
-        elevMin, elevMax = (int(m.group(1)), int(m.group(2))) if m else (None, None)
-        flow = "dry" if "/dry/" in path else "wet" if "/wet/" in path else None
-        m = re.search(r"-(\d)(?:/|$)", path)
-        ppm = int(m.group(1)) if m else None
-        m = re.search(r"Size(\d)", path)
-        pem = int(m.group(1)) if m else None
-        rSize = None
-        if ppm is not None and pem is not None:
-            diff = ppm - pem
-            rSize = max(1, 5 - diff)
-
-        gdf_pf["subC"] = subC
-        gdf_pf["sector"] = sector
-        gdf_pf["elevMin"] = elevMin
-        gdf_pf["elevMax"] = elevMax
-        gdf_pf["flow"] = flow
-        gdf_pf["ppm"] = ppm
-        gdf_pf["pem"] = pem
-        gdf_pf["rSize"] = rSize
-
-        dataUtils.writeGeoData(gdf_pf, praFile)
+        with rasterio.Env(GDAL_CACHEMAX=512):
+            with rasterio.open(rasterFile) as src:
+                rasterBox = shapely.box(*src.bounds)
+                shapely.prepare(rasterBox)
+                hits = maskIndex.query(rasterBox, predicate="intersects")
+                for maskName, geoms in (maskList[i] for i in np.sort(hits)):
+                    outName = f"praID{maskName}_{os.path.basename(rasterFile)}"
+                    if outName in existing:
+                        continue
+                    outPath = os.path.join(outputDir, outName)
+                    # bbox hit only: skip masks whose geometries miss the raster
+                    # (mask() would raise and end this raster's loop)
+                    if not shapely.intersects(rasterBox, geoms).any():
+                        continue
+                    outImage, outTransform = mask(src, geoms, crop=True)
+                    outMeta = src.meta.copy()
+                    outMeta.update(
+                        driver="GTiff",
+                        height=outImage.shape[1],
+                        width=outImage.shape[2],
+                        transform=outTransform,
+                    )
+                    outMeta.update(creationOptions or _clipCreationOptions())
+                    with rasterio.open(outPath, "w", **outMeta) as dest:
+                        dest.write(outImage)
+                    existing.add(outName)
+                    done += 1
     except Exception:
-        log.exception("Failed to extract metadata for %s", relPath(praFile, cairosDir))
+        log.exception("Failed to clip %s", relPath(rasterFile, cairosDir))
+        return done, 1
+    return done, 0
 
 
-def clipRastersByMasks(maskDir, outputsDir, outputDir, cairosDir, max_workers=4):
-    maskFiles = sorted(glob.glob(os.path.join(maskDir, "praID*.geojson")))
+# Clip masks (and their bbox index) and existing output names shared by all tasks
+# of a process-pool worker
+_workerClipMasks = {}
+_workerExisting = set()
+
+
+def _init_clip_worker(clipMasks, existing):
+    """Process-pool initializer: keep the mask lists, their STRtrees and the output listing."""
+    global _workerClipMasks, _workerExisting
+    _workerClipMasks = clipMasks
+    _workerExisting = existing
+
+
+def _clip_one_raster_in_worker(rasterFile, maskKey, outputDir, cairosDir, creationOptions=None):
+    maskList, maskIndex = _workerClipMasks[maskKey]
+    return _clip_one_raster(
+        rasterFile, maskList, maskIndex, outputDir, cairosDir, creationOptions, _workerExisting
+    )
+
+
+def _iter_subdirs(root, prefix=""):
+    """Yield subdirectory paths of ``root`` whose name starts with ``prefix``."""
+    try:
+        with os.scandir(root) as it:
+            entries = list(it)
+    except OSError:
+        return
+    for entry in entries:
+        if entry.name.startswith(prefix) and entry.is_dir():
+            yield entry.path
+
+
+def _iter_tifs(root, recursive=True):
+    """Yield .tif paths below ``root`` (os.scandir walk; hidden entries skipped like glob)."""
+    try:
+        with os.scandir(root) as it:
+            entries = list(it)
+    except OSError:
+        return
+    for entry in entries:
+        if entry.name.startswith("."):
+            continue
+        if entry.is_dir():
+            if recursive:
+                yield from _iter_tifs(entry.path)
+        elif entry.name.endswith(".tif"):
+            yield entry.path
+
+
+def _iter_masks(maskFiles, layout, cairosDir):
+    """Yield (maskName, GeoDataFrame) per praID, from praID<k> files or the praIDs.gpkg table."""
+    for mf in maskFiles:
+        try:
+            maskGdf = dataUtils.readGeoData(mf, columns=["modType", "praID"])
+        except Exception:
+            log.exception("Failed to read mask %s", relPath(mf, cairosDir))
+            continue
+        if layout == "singleGPKG":
+            for k, grp in maskGdf.groupby("praID", sort=True):
+                yield f"praID{int(k)}", grp
+        else:
+            yield os.path.splitext(os.path.basename(mf))[0], maskGdf
+
+
+def clipRastersByMasks(
+    maskDir,
+    outputsDir,
+    outputDir,
+    cairosDir,
+    max_workers=4,
+    poolType="process",
+    driver="GeoJSON",
+    layout="files",
+    creationOptions=None,
+):
+    """Clip the scenario rasters by the praID masks; True if every raster was clipped."""
+    maskFiles = sorted(glob.glob(os.path.join(maskDir, singleAvaPattern(driver, layout))))
     if not maskFiles:
         log.warning("No PRA masks found in %s", relPath(maskDir, cairosDir))
-        return
+        return False
 
     rasterFiles = []
     for subdir in ["peakFiles", "sizeFiles"]:
-        searchDir = os.path.join(outputsDir, subdir)
-        if os.path.isdir(searchDir):
-            rasterFiles.extend(
-                glob.glob(os.path.join(searchDir, "**", "*.tif"), recursive=True)
-            )
+        rasterFiles.extend(_iter_tifs(os.path.join(outputsDir, subdir)))
 
     relDir = os.path.join(os.path.dirname(os.path.dirname(outputsDir)), "Inputs", "REL")
-    relRasterFiles = (
-        glob.glob(os.path.join(relDir, "*.tif")) if os.path.isdir(relDir) else []
-    )
+    relRasterFiles = list(_iter_tifs(relDir, recursive=False))
 
     if not rasterFiles and not relRasterFiles:
         log.warning("No rasters found under %s", relPath(outputsDir, cairosDir))
-        return
-
-    def _clip_one_raster(rasterFile, use_res_only=False):
-        done = 0
-        try:
-            with rasterio.Env(GDAL_CACHEMAX=512):
-                with rasterio.open(rasterFile) as src:
-                    for mf in maskFiles:
-                        feats = list(fiona.open(mf))
-                        geoms = [
-                            f["geometry"]
-                            for f in feats
-                            if (not use_res_only)
-                            or f["properties"].get("modType") == "res"
-                        ]
-                        if not geoms:
-                            continue
-                        outName = f"praID{os.path.basename(mf).replace('.geojson','')}_{os.path.basename(rasterFile)}"
-                        outPath = os.path.join(outputDir, outName)
-                        if os.path.exists(outPath):
-                            continue
-                        outImage, outTransform = mask(src, geoms, crop=True)
-                        outMeta = src.meta.copy()
-                        outMeta.update(
-                            driver="GTiff",
-                            height=outImage.shape[1],
-                            width=outImage.shape[2],
-                            transform=outTransform,
-                            compress="LZW",
-                        )
-                        with rasterio.open(outPath, "w", **outMeta) as dest:
-                            dest.write(outImage)
-                        done += 1
-        except Exception:
-            log.exception("Failed to clip %s", relPath(rasterFile, cairosDir))
-        return done
+        return True
+
+    # mask geometries are the same for every raster → read each mask file once
+    masksAll, masksResOnly = [], []
+    for maskName, maskGdf in _iter_masks(maskFiles, layout, cairosDir):
+        geoms = list(maskGdf.geometry)
+        if geoms:
+            masksAll.append((maskName, geoms))
+        if "modType" in maskGdf.columns:
+            resGeoms = list(maskGdf.geometry[(maskGdf["modType"] == "res").to_numpy()])
+            if resGeoms:
+                masksResOnly.append((maskName, resGeoms))
+
+    # bounding boxes of the masks in an R-tree → per raster only the masks it covers
+    indexAll = shapely.STRtree([shapely.box(*shapely.total_bounds(g)) for _, g in masksAll])
+    indexResOnly = shapely.STRtree([shapely.box(*shapely.total_bounds(g)) for _, g in masksResOnly])
 
     log.info(
         "Clipping %d simulation rasters + %d REL rasters...",
         len(rasterFiles),
         len(relRasterFiles),
     )
-    with ThreadPoolExecutor(max_workers=max_workers) as ex:
-        futures = [ex.submit(_clip_one_raster, rf, False) for rf in rasterFiles]
-        if relRasterFiles:
-            futures += [ex.submit(_clip_one_raster, rf, True) for rf in relRasterFiles]
-        total = sum(f.result() for f in as_completed(futures))
+    clipMasks = {"all": (masksAll, indexAll), "res": (masksResOnly, indexResOnly)}
+    tasks = [(rf, "all") for rf in rasterFiles] + [(rf, "res") for rf in relRasterFiles]
+    # masks live in outputDir too → list it once; output names are unique per (mask, raster)
+    existing = set(os.listdir(outputDir))
+
+    # mask building inside rasterio.mask holds the GIL → processes scale better than
+    # threads. Processes receive the masks once through the initializer.
+    if poolType == "process":
+        executor = ProcessPoolExecutor(
+            max_workers=max(1, max_workers),
+            initializer=_init_clip_worker,
+            initargs=(clipMasks, existing),
+        )
+        with executor as ex:
+            futures = [
+                ex.submit(
+                    _clip_one_raster_in_worker, rf, key, outputDir, cairosDir, creationOptions
+                )
+                for rf, key in tasks
+            ]
+            results = [f.result() for f in as_completed(futures)]
+    else:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as ex:
+            futures = [
+                ex.submit(
+                    _clip_one_raster,
+                    rf,
+                    *clipMasks[key],
+                    outputDir,
+                    cairosDir,
+                    creationOptions,
+                    existing,
+                )
+                for rf, key in tasks
+            ]
+            results = [f.result() for f in as_completed(futures)]
+    total = sum(done for done, _ in results)
+    failed = sum(f for _, f in results)
     log.info("Wrote %d clipped rasters in %s", total, relPath(outputDir, cairosDir))
+    if failed:
+        log.warning("%d rasters failed to clip in %s", failed, relPath(outputDir, cairosDir))
+    return failed == 0
+
 
+def _link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        # e.g. cross-device or no hardlink support on the filesystem
+        shutil.copy2(src, dst)
+    return dst
+
+
+def _fast_copytree(src, dst, method="copy"):
+    """copytree with hardlinks (method="hardlink") or copy-on-write clones (method="reflink").
 
-def collectSingleAvaDirs(baseDir, avaDirData, avaDirLib, cairosDir):
+    Falls back to a plain copy where the filesystem does not support the method.
+    Hardlinked files share their data with the FlowPy tree, so they must not be
+    modified in place afterwards.
+    """
+    if method == "hardlink":
+        shutil.copytree(src, dst, copy_function=_link_or_copy)
+        return
+    if method == "reflink":
+        try:
+            subprocess.run(
+                ["cp", "-a", "--reflink=auto", str(src), str(dst)],
+                check=True,
+                capture_output=True,
+            )
+            return
+        except (OSError, subprocess.CalledProcessError):
+            log.debug("cp --reflink failed for %s; falling back to copytree", src)
+            shutil.rmtree(dst, ignore_errors=True)
+    shutil.copytree(src, dst)
+
+
+def collectSingleAvaDirs(
+    baseDir,
+    avaDirData,
+    avaDirLib,
+    cairosDir,
+    driver="GeoJSON",
+    collectMethod="copy",
+    layout="files",
+):
     targetRoot = avaDirData
     libRoot = avaDirLib
     targetRoot.mkdir(parents=True, exist_ok=True)
     libRoot.mkdir(parents=True, exist_ok=True)
     log.info("Collecting com4_* folders into %s", relPath(targetRoot, cairosDir))
 
-    com4Folders = []
-    for pattern in [
-        os.path.join(baseDir, "pra*/Size*/dry/Map/singleAvaDir/com4_*"),
-        os.path.join(baseDir, "pra*/Size*/wet/Map/singleAvaDir/com4_*"),
-    ]:
-        com4Folders.extend(glob.glob(pattern))
+    # pra*/Size*/{dry,wet}/Map/singleAvaDir/com4_* (all dry folders first, as before)
+    sizeDirs = [
+        sizeDir for praDir in _iter_subdirs(baseDir, "pra") for sizeDir in _iter_subdirs(praDir, "Size")
+    ]
+    com4Folders = [
+        com4Dir
+        for flowChoice in ("dry", "wet")
+        for sizeDir in sizeDirs
+        for com4Dir in _iter_subdirs(
+            os.path.join(sizeDir, flowChoice, "Map", "singleAvaDir"), "com4_"
+        )
+    ]
 
     for src in com4Folders:
         dst = targetRoot / os.path.basename(src)
         if not dst.exists():
             try:
-                shutil.copytree(src, dst)
+                _fast_copytree(src, dst, collectMethod)
             except Exception:
                 log.exception("Failed to copy %s", relPath(src, cairosDir))
 
     # keep legacy csv (small cases). You already have flags to disable CSV elsewhere.
-    allRecords = []
+    # Streamed file by file: the first pass only reads layer schemas to get the column
+    # union (same order as a concat), the second appends attribute tables to the CSV.
+    praPattern = singleAvaPattern(driver, layout)
+    praFiles = []
+    columns = {}
     for com4Dir in sorted(glob.glob(os.path.join(targetRoot, "com4_*"))):
-        for pf in glob.glob(os.path.join(com4Dir, "praID*.geojson")):
+        for pf in glob.glob(os.path.join(com4Dir, praPattern)):
             try:
-                gdf = dataUtils.readGeoData(pf)
-                df = gdf.drop(columns="geometry", errors="ignore").copy()
-                df["com4Dir"] = os.path.basename(com4Dir)
-                allRecords.append(df)
+                columns.update(dict.fromkeys(dataUtils.readGeoColumns(pf) + ["com4Dir"]))
+                praFiles.append((pf, os.path.basename(com4Dir)))
             except Exception:
                 log.exception("Failed to read %s", relPath(pf, cairosDir))
 
-    if allRecords:
-        merged = pd.concat(allRecords, ignore_index=True)
+    nRows = 0
+    if praFiles:
         csvPath = libRoot / "avaDirectory.csv"
-        merged.to_csv(csvPath, index=False)
-        log.info("Merged %d rows into %s", len(merged), relPath(csvPath, cairosDir))
+        with open(csvPath, "w", newline="") as fh:
+            pd.DataFrame(columns=list(columns)).to_csv(fh, index=False)
+            for pf, com4Name in praFiles:
+                try:
+                    df = dataUtils.readGeoData(pf, readGeometry=False)
+                    df["com4Dir"] = com4Name
+                    df.reindex(columns=list(columns)).to_csv(fh, header=False, index=False)
+                    nRows += len(df)
+                except Exception:
+                    log.exception("Failed to read %s", relPath(pf, cairosDir))
+        log.info("Merged %d rows into %s", nRows, relPath(csvPath, cairosDir))
     else:
         log.info(
-            "No praID*.geojson found for legacy avaDirectory.csv creation (this is OK in parquet-only mode)."
+            "No praID* files found for legacy avaDirectory.csv creation (this is OK in parquet-only mode)."
         )
 
 
+def _to_arrow_dtypes(gdf):
+    """Convert the attribute columns (not the geometry) to pyarrow-backed dtypes."""
+    geomCol = gdf.geometry.name
+    attrs = gdf.drop(columns=geomCol).convert_dtypes(convert_integer=False, dtype_backend="pyarrow")
+    attrs[geomCol] = gdf[geomCol]
+    return gpd.GeoDataFrame(attrs[list(gdf.columns)], geometry=geomCol, crs=gdf.crs)
+
+
 def _normalize_ids(df):
-    cols = {c: c for c in df.columns}
+    rename = {}
     for c in df.columns:
         lc = c.lower()
-        if lc == "pra_id":
-            cols[c] = "PRA_id"
-        elif lc == "praid":
-            cols[c] = "praID"
-    if list(cols.values()) != list(df.columns):
-        df = df.rename(columns=cols)
-    return df
-
-
-def _extract_int_like(v):
-    try:
-        return int(float(v))
-    except Exception:
-        return None
+        if lc == "pra_id" and c != "PRA_id":
+            rename[c] = "PRA_id"
+        elif lc == "praid" and c != "praID":
+            rename[c] = "praID"
+    return df.rename(columns=rename) if rename else df
+
+
+def _extract_int_keys(series):
+    """PRA ids → nullable Int64 keys (truncated like int(float(v))), <NA> where not numeric."""
+    num = pd.to_numeric(series, errors="coerce").astype("float64")
+    num = num.where(np.isfinite(num))
+    return np.trunc(num).astype("Int64")
+
+
+def _praIdKeys(gdf):
+    """Integer keys from praID (else PRA_id) after normalizing the column names; None if neither."""
+    gdf = _normalize_ids(gdf)
+    for col in ("praID", "PRA_id"):
+        if col in gdf.columns:
+            return _extract_int_keys(gdf[col])
+    return None
+
+
+def singleAvaPattern(driver="GeoJSON", layout="files"):
+    """Glob pattern of the per-praID outputs in a com4_* folder."""
+    if layout == "singleGPKG":
+        return SINGLE_GPKG_NAME
+    return f"praID*{dataUtils.vectorExtension(driver)}"
 
 
 def _findRelJson(outputsDir):
@@ -11,8 +11,8 @@
 #     - 11_avaDirectoryData/com4_*/   (FlowPy result rasters)
 #
 # Outputs :
-#     - 12_avaDirectory/avaDirectoryResults.csv  | .geojson | .parquet
-#     - 12_avaDirectory/indexAvaFiles.pkl
+#     - 12_avaDirectory/avaDirectoryResults.csv  | .geojson (.geojsonl) | .parquet
+#     - 12_avaDirectory/indexAvaFiles.arrow   (raster file index cache, Feather)
 #
 # Config :
 #     [avaDIRECTORY]
@@ -39,12 +39,16 @@
 # ----------------------------------------------------------------------- #
 
 import os
-import pickle
+import re
+import json
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 import pandas as pd
 import geopandas as gpd
+import pyarrow as pa
+import pyarrow.feather as feather
 
 import ati.mod0Helper.dataUtils as dataUtils
 from ati.mod0Helper.dataUtils import relPath
@@ -53,7 +57,7 @@ log = logging.getLogger(__name__)
 logging.getLogger("pyogrio").setLevel(logging.WARNING)
 
 import sys
-from functools import partial
+from functools import lru_cache, partial
 from tqdm import tqdm as _tqdm
 
 tqdm = partial(
@@ -106,7 +110,7 @@ def runAvaDirResults(cfg, workFlowDir):
     outCsv = avaDirLib / "avaDirectoryResults.csv"
     outGeoJson = avaDirLib / "avaDirectoryResults.geojson"
     outParquet = avaDirLib / "avaDirectoryResults.parquet"
-    indexAvaFiles = avaDirLib / "indexAvaFiles.pkl"
+    indexAvaFiles = avaDirLib / "indexAvaFiles.arrow"
 
     # --- Flags from config ---
     forceRebuildIndex = avaCfg.getboolean("forceRebuildIndex", False)
@@ -114,6 +118,9 @@ def runAvaDirResults(cfg, workFlowDir):
 
     writeCsv = avaCfg.getboolean("writeResultsCsv", True)
     writeGeoJSON = avaCfg.getboolean("writeResultsGeoJSON", True)
+    # newline-delimited GeoJSON (GeoJSONSeq) streams features instead of one JSON array
+    if avaCfg.getboolean("writeResultsGeoJSONl", False):
+        outGeoJson = outGeoJson.with_suffix(".geojsonl")
     writeParquet = avaCfg.getboolean("writeResultsParquet", True)
 
     log.info(
@@ -138,7 +145,7 @@ def runAvaDirResults(cfg, workFlowDir):
     # --- Build or load raster file index (optional) ---
     buildIndex = avaCfg.getboolean("buildResultsRasterIndex", True)
 
-    index = {}
+    index = _fileIndexFrame({}, typePatterns)
     if buildIndex:
         index = _loadOrBuildFileIndex(
             avaDirData,
@@ -147,7 +154,7 @@ def runAvaDirResults(cfg, workFlowDir):
             forceRebuildIndex,
             cairosDir,
         )
-        if not index:
+        if index.empty:
             log.warning(
                 "Step 15: No raster index entries found — outputs will be attributes only."
             )
@@ -160,6 +167,7 @@ def runAvaDirResults(cfg, workFlowDir):
     # --- Merge AvaDirectoryType with index ---
     avaDir = _makeAvaDirResults(
         avaDirLib=avaDirLib,
+        avaDirData=avaDirData,
         avaTypeParquet=avaTypeParquet,
         avaTypeGeoJSON=avaTypeGeoJSON,
         fileIndex=index,
@@ -174,8 +182,9 @@ def runAvaDirResults(cfg, workFlowDir):
         cairosDir=cairosDir,
     )
 
-    resCount = (avaDir["modType"] == "res").sum() if "modType" in avaDir.columns else 0
-    relCount = (avaDir["modType"] == "rel").sum() if "modType" in avaDir.columns else 0
+    modCounts = avaDir["modType"].value_counts() if "modType" in avaDir.columns else {}
+    resCount = int(modCounts.get("res", 0))
+    relCount = int(modCounts.get("rel", 0))
     log.info(
         "Step 15: AvaDirectoryResults written: %d features (res=%d, rel=%d)",
         len(avaDir),
@@ -186,64 +195,167 @@ def runAvaDirResults(cfg, workFlowDir):
     return avaDir
 
 
-def _buildFileIndex(avaDirData: Path, typePatterns: dict) -> dict:
-    """Scan all com4_* folders and map raster paths by (praID, resultID)."""
+# clipped rasters are named praID<maskName>_<raster>.tif with maskName = praID<k>
+# (bytes: file names are scanned undecoded, see _scanCom4Dir)
+_RE_PRA_ID = re.compile(rb"^(?:praID)+(\d+)_")
+
+
+def _listCom4Dirs(avaDirData: Path) -> dict:
+    """Return the com4_* folders below the resolved data root as {resultID: DirEntry}."""
+    # scandir entries carry d_type → no stat per entry
+    dataRoot = os.path.realpath(avaDirData)
+    try:
+        with os.scandir(dataRoot) as it:
+            return {
+                e.name.split("com4_")[1]: e
+                for e in it
+                if e.name.startswith("com4_") and e.is_dir()
+            }
+    except OSError:
+        return {}
+
+
+def _buildFileIndex(com4Dirs: dict, typePatterns: dict) -> dict:
+    """Scan the given com4_* folders and map raster paths by (praID, resultID)."""
     index = {}
-    com4Dirs = list(avaDirData.glob("com4_*"))
     if not com4Dirs:
-        log.warning("Step 15: No com4_* folders found in %s", avaDirData)
         return index
 
-    for com4Dir in tqdm(
-        com4Dirs,
-        desc="Step 15: Building file index",
-        unit="folder",
-    ):
-        rid = com4Dir.name.split("com4_")[1]
-        for tifPath in com4Dir.glob("*.tif"):
-            fname = tifPath.name
-            if "praID" not in fname:
-                continue
-            praStr = fname.split("_")[0].replace("praID", "")
-            try:
-                pra = int(praStr)
-            except ValueError:
-                continue
-            for t, pat in typePatterns.items():
-                if pat in fname:
-                    index.setdefault((pra, rid), {})[t] = str(tifPath.resolve())
-                    break
+    # all patterns anchor at the file name tail → one C-level endswith(tuple) per file;
+    # longest first so a more specific suffix wins over one it ends with
+    suffixTypes = {os.fsencode(pat): t for t, pat in typePatterns.items()}
+    suffixes = tuple(sorted(suffixTypes, key=len, reverse=True))
+
+    # folders are independent and scandir releases the GIL → overlap the directory reads
+    maxWorkers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=maxWorkers) as ex:
+        futures = [
+            ex.submit(_scanCom4Dir, e.path, rid, suffixes, suffixTypes)
+            for rid, e in com4Dirs.items()
+        ]
+        for fut in tqdm(
+            as_completed(futures),
+            total=len(futures),
+            desc="Step 15: Building file index",
+            unit="folder",
+        ):
+            for pra, rid, t, path in fut.result():
+                index.setdefault((pra, rid), {})[t] = path
     return index
 
 
+def _scanCom4Dir(com4Path, rid, suffixes, suffixTypes):
+    """Return (praID, resultID, rasterType, path) for the praID rasters of one com4_* folder."""
+    # resolve the folder once (a symlinked com4_* folder points elsewhere) and join
+    # file names onto it instead of a realpath per file
+    resolvedDir = os.path.realpath(com4Path)
+    # a bytes path makes scandir return raw bytes names → suffix and praID matching
+    # without decoding every name; only kept paths are decoded
+    with os.scandir(os.fsencode(resolvedDir)) as it:
+        tifEntries = [e for e in it if e.name.endswith(suffixes) and e.is_file()]
+    found = []
+    for entry in tifEntries:
+        fname = entry.name
+        m = _RE_PRA_ID.match(fname)
+        if not m:
+            continue
+        pra = int(m.group(1))
+        for pat in suffixes:
+            if fname.endswith(pat):
+                path = f"{resolvedDir}{os.sep}{os.fsdecode(fname)}"
+                found.append((pra, rid, suffixTypes[pat], path))
+                break
+    return found
+
+
+def _fileIndexFrame(index: dict, typePatterns: dict) -> pd.DataFrame:
+    """Index dict → one row per (praID, resultID) with an absolute path column per raster type."""
+    pathCols = {t: f"path{t.capitalize()}" for t in sorted(typePatterns)}
+    idxDf = pd.DataFrame.from_records(
+        [
+            {"praID": pra, "resultID": rid, **{pathCols[t]: p for t, p in entry.items()}}
+            for (pra, rid), entry in index.items()
+        ],
+        columns=["praID", "resultID", *pathCols.values()],
+    )
+    return idxDf.astype({"praID": "Int64", "resultID": "string[pyarrow]"})
+
+
+def _writeIndexCache(index, com4Mtimes, indexFile):
+    """Write the index as Feather, with the scanned com4_* folder mtimes in the schema metadata."""
+    table = pa.Table.from_pandas(index, preserve_index=False)
+    meta = {**(table.schema.metadata or {}), b"com4Mtimes": json.dumps(com4Mtimes).encode()}
+    feather.write_feather(table.replace_schema_metadata(meta), indexFile)
+
+
+def _readIndexCache(indexFile, typePatterns):
+    """Read a cached index and the com4_* folder mtimes it was built from."""
+    table = feather.read_table(indexFile)
+    com4Mtimes = json.loads((table.schema.metadata or {}).get(b"com4Mtimes", b"{}"))
+    pathCols = [f"path{t.capitalize()}" for t in sorted(typePatterns)]
+    index = (
+        table.to_pandas()
+        .reindex(columns=["praID", "resultID", *pathCols])
+        .astype({"praID": "Int64", "resultID": "string[pyarrow]"})
+    )
+    return index, com4Mtimes
+
+
 def _loadOrBuildFileIndex(avaDirData, indexFile, typePatterns, forceRebuild, cairosDir):
-    """Load cached index or rebuild from rasters."""
+    """Load the cached index (Feather table) and rescan only new or changed com4_* folders."""
+    com4Dirs = _listCom4Dirs(avaDirData)
+    if not com4Dirs:
+        log.warning("Step 15: No com4_* folders found in %s", avaDirData)
+    # a folder's mtime changes when rasters are added, removed or renamed in it
+    com4Mtimes = {rid: e.stat().st_mtime_ns for rid, e in com4Dirs.items()}
+
+    cached = None
     if indexFile.exists() and not forceRebuild:
         try:
-            with open(indexFile, "rb") as f:
-                index = pickle.load(f)
-            log.info(
-                "Step 15: Loaded cached index (%d entries) from %s",
-                len(index),
-                relPath(indexFile, cairosDir),
-            )
-            return index
+            cached, cachedMtimes = _readIndexCache(indexFile, typePatterns)
         except Exception as e:
             log.warning("Step 15: Failed to load cached index (%s), rebuilding...", e)
 
-    log.info("Step 15: Building file index from %s", relPath(avaDirData, cairosDir))
-    index = _buildFileIndex(avaDirData, typePatterns)
-    with open(indexFile, "wb") as f:
-        pickle.dump(index, f)
+    if cached is None:
+        log.info("Step 15: Building file index from %s", relPath(avaDirData, cairosDir))
+        index = _fileIndexFrame(_buildFileIndex(com4Dirs, typePatterns), typePatterns)
+        _writeIndexCache(index, com4Mtimes, indexFile)
+        log.info(
+            "Step 15: File index built → %d PRA/resultID combinations",
+            len(index),
+        )
+        return index
+
+    # reuse unchanged folders, rescan new/changed ones, drop vanished ones
+    stale = {rid for rid, m in com4Mtimes.items() if cachedMtimes.get(rid) != m}
+    if not stale and set(cachedMtimes) == set(com4Mtimes):
+        log.info(
+            "Step 15: Loaded cached index (%d entries) from %s",
+            len(cached),
+            relPath(indexFile, cairosDir),
+        )
+        return cached
+
+    keep = cached["resultID"].isin([rid for rid in com4Mtimes if rid not in stale])
+    rescanned = _fileIndexFrame(
+        _buildFileIndex({rid: com4Dirs[rid] for rid in stale}, typePatterns), typePatterns
+    )
+    index = pd.concat([cached[keep.to_numpy()], rescanned], ignore_index=True)
+    _writeIndexCache(index, com4Mtimes, indexFile)
     log.info(
-        "Step 15: File index built → %d PRA/resultID combinations",
+        "Step 15: Updated cached index → %d PRA/resultID combinations "
+        "(%d com4 folders reused, %d rescanned, %d removed)",
         len(index),
+        len(com4Mtimes) - len(stale),
+        len(stale),
+        len(set(cachedMtimes) - set(com4Mtimes)),
     )
     return index
 
 
 def _makeAvaDirResults(
     avaDirLib,
+    avaDirData,
     avaTypeParquet,
     avaTypeGeoJSON,
     fileIndex,
@@ -290,10 +402,14 @@ def _makeAvaDirResults(
     avaDir["resultID"] = avaDir.get(
         "resultID",
         pd.Series([pd.NA] * len(avaDir)),
-    ).astype("string")
+    ).astype("string[pyarrow]")
+
+    # few distinct values (rel/res) → categorical codes instead of one string per row
+    if "modType" in avaDir.columns:
+        avaDir["modType"] = avaDir["modType"].astype("category")
 
     before = len(avaDir)
-    avaDir = avaDir[avaDir["praID"].notna() & avaDir["resultID"].notna()].copy()
+    avaDir.dropna(subset=["praID", "resultID"], inplace=True)
     dropped = before - len(avaDir)
     if dropped:
         log.info("Step 15: Dropped %d rows missing praID/resultID", dropped)
@@ -305,31 +421,68 @@ def _makeAvaDirResults(
         len(allTypes),
         allTypes,
     )
+    pathCols = {t: f"path{t.capitalize()}" for t in allTypes}
 
-    for t in allTypes:
-        col = f"path{t.capitalize()}"
-        if col not in avaDir.columns:
-            avaDir[col] = None
+    # files of one folder share its relative prefix → relpath once per directory
+    @lru_cache(maxsize=4096)
+    def _relDir(d):
+        return os.path.relpath(d, start=avaDirLib)
 
     def _rel(p):
         try:
-            return os.path.relpath(p, start=avaDirLib) if p else None
+            if not p:
+                return None
+            d, name = os.path.split(p)
+            return os.path.join(_relDir(d), name)
         except Exception:
             return None
 
-    # NOTE: iterrows is simple but not ideal for 100M Zeilen → ggf. später vectorisieren
-    for i, row in avaDir.iterrows():
-        key = (int(row["praID"]), str(row["resultID"]))
-        entry = fileIndex.get(key)
-        if not entry:
-            continue
-        for t, pathVal in entry.items():
-            avaDir.at[i, f"path{t.capitalize()}"] = _rel(pathVal)
+    # one row per (praID, resultID) of the index → a single left merge instead of
+    # per-row lookups and scalar assignments
+    # only raster types that occur in the index take part in the merge; the others
+    # are added as empty Arrow string columns below
+    idxCols = [c for c in pathCols.values() if fileIndex[c].notna().any()]
+    idxDf = fileIndex[["praID", "resultID", *idxCols]].copy()
+    # indexed paths lie below the resolved data root → relativize the root once and
+    # swap prefixes; paths elsewhere (e.g. an older cached index) go through _rel
+    dataDir = os.path.realpath(avaDirData)
+    dataRoot = dataDir + os.sep
+    try:
+        relRoot = os.path.relpath(dataDir, start=avaDirLib)
+    except ValueError:  # e.g. different drives on Windows
+        relRoot = None
+    for col in idxCols:
+        paths = idxDf[col].astype("string[pyarrow]")
+        under = paths.str.startswith(dataRoot).fillna(False) & bool(relRoot)
+        relPaths = (f"{relRoot}{os.sep}" + paths.str.removeprefix(dataRoot)).where(under)
+        rest = paths.notna() & ~under
+        relPaths[rest] = paths[rest].map(_rel)
+        idxDf[col] = relPaths
+
+    # join on (praID, integer resultID code): one factorize over both key columns,
+    # then the merge compares ints instead of hashing strings per row
+    ridCodes, _ = pd.factorize(pd.concat([avaDir["resultID"], idxDf["resultID"]], ignore_index=True))
+    avaDir["_ridCode"] = ridCodes[: len(avaDir)].astype("int32")
+    idxDf = idxDf.drop(columns="resultID").assign(_ridCode=ridCodes[len(avaDir) :].astype("int32"))
+    avaDir = avaDir.merge(idxDf, on=["praID", "_ridCode"], how="left", suffixes=("", "_idx"))
+    avaDir = avaDir.drop(columns="_ridCode")
+    for col in pathCols.values():
+        # path columns already in the Type table keep their values where the index has none
+        if f"{col}_idx" in avaDir.columns:
+            avaDir[col] = avaDir.pop(f"{col}_idx").fillna(avaDir[col])
+        # highly repetitive strings → Arrow-backed storage instead of Python objects;
+        # types without any raster still get their (all-null) column
+        if col in avaDir.columns:
+            avaDir[col] = avaDir[col].astype("string[pyarrow]")
+        else:
+            avaDir[col] = pd.array([pd.NA] * len(avaDir), dtype="string[pyarrow]")
+    # path columns last, in type order, whichever of them came from the merge
+    avaDir = avaDir[[c for c in avaDir.columns if c not in pathCols.values()] + list(pathCols.values())]
 
     # --- Write outputs according to flags ---
     if writeCsv:
         try:
-            avaDir.drop(columns="geometry", errors="ignore").to_csv(outCsv, index=False)
+            dataUtils.writeCsv(avaDir.drop(columns="geometry", errors="ignore"), outCsv)
             log.info(
                 "Step 15: Wrote CSV AvaDirectoryResults to %s",
                 relPath(outCsv, cairosDir),
@@ -339,7 +492,7 @@ def _makeAvaDirResults(
 
     if writeGeoJSON:
         try:
-            avaDir.to_file(outGeoJson, driver="GeoJSON")
+            dataUtils.writeGeoData(avaDir, outGeoJson)
             log.info(
                 "Step 15: Wrote GeoJSON AvaDirectoryResults to %s",
                 relPath(outGeoJson, cairosDir),
@@ -349,7 +502,16 @@ def _makeAvaDirResults(
 
     if writeParquet:
         try:
-            avaDir.to_parquet(outParquet, index=False)
+            # repetitive path strings → dictionary pages + ZSTD are much smaller than Snappy
+            avaDir.to_parquet(
+                outParquet,
+                index=False,
+                compression="zstd",
+                compression_level=3,
+                row_group_size=256_000,
+                use_dictionary=True,
+                data_page_version="2.0",
+            )
             log.info(
                 "Step 15: Wrote Parquet AvaDirectoryResults to %s",
                 relPath(outParquet, cairosDir),
@@ -8,7 +8,8 @@
 #     classification and filtering.
 #
 # Inputs :
-#     - 11_avaDirectoryData/com4_*/praID*.geojson
+#     - 11_avaDirectoryData/com4_*/praID*.geojson (or .fgb/.gpkg/praIDs.gpkg, see
+#       singleAvaDriver and singleAvaLayout)
 #
 # Outputs :
 #     - 12_avaDirectory/avaDirectoryType.csv
@@ -89,6 +90,12 @@ def runAvaDirType(cfg, workFlowDir):
     # --- Mode flags ---
     readSingleAvaGeoJSON = avaCfg.getboolean("readSingleAvaGeoJSON", True)
     readScenarioParquet = avaCfg.getboolean("readScenarioParquet", False)
+    # per-praID outputs of Step 13 (singleAvaDriver / singleAvaLayout)
+    if avaCfg.get("singleAvaLayout", fallback="files").strip() == "singleGPKG":
+        singleAvaPattern = "praIDs.gpkg"
+    else:
+        singleAvaDriver = avaCfg.get("singleAvaDriver", fallback="GeoJSON").strip()
+        singleAvaPattern = f"praID*{dataUtils.vectorExtension(singleAvaDriver)}"
 
     # Output flags
     writeCsv = avaCfg.getboolean("writeTypeCsv", True)
@@ -142,7 +149,7 @@ def runAvaDirType(cfg, workFlowDir):
         log.info("Step 14: Found %d scenario parquet files", len(inputFiles))
 
     elif readSingleAvaGeoJSON:
-        # Legacy mode: read from 11_avaDirectoryData/com4_*/praID*.geojson
+        # Legacy mode: read from 11_avaDirectoryData/com4_*/praID*.geojson (or singleAvaDriver)
         avaDirData = rootDir / "11_avaDirectoryData"
         if not avaDirData.exists():
             log.warning(
@@ -159,9 +166,9 @@ def runAvaDirType(cfg, workFlowDir):
             return
 
         for com4Dir in com4Folders:
-            inputFiles.extend(glob.glob(os.path.join(com4Dir, "praID*.geojson")))
+            inputFiles.extend(glob.glob(os.path.join(com4Dir, singleAvaPattern)))
 
-        log.info("Step 14: Found %d legacy praID*.geojson files", len(inputFiles))
+        log.info("Step 14: Found %d legacy %s files", len(inputFiles), singleAvaPattern)
 
     else:
         log.error(
@@ -7,6 +7,7 @@ import zipfile
 import logging
 import subprocess
 import contextlib
+import functools
 import time
 from typing import Union, List, Tuple
 
@@ -16,6 +17,8 @@ import rasterio
 from rasterio.features import rasterize
 from rasterio.errors import RasterioIOError
 import geopandas as gpd
+import shapely
+from pyproj import CRS, Transformer
 
 try:
     import pyogrio
@@ -24,6 +27,14 @@ try:
 except Exception:
     _HAS_PYOGRIO = False
 
+try:
+    import pyarrow
+    import pyarrow.csv as pacsv
+
+    _HAS_ARROW = True
+except Exception:
+    _HAS_ARROW = False
+
 import ati.mod0Helper.cfgUtils as cfgUtils
 
 log = logging.getLogger(__name__)
@@ -52,9 +63,30 @@ def timeIt(label, level=logging.DEBUG):
         log.log(level, "%s finished in %.2fs", label, time.perf_counter() - t0)
 
 
+@functools.lru_cache(maxsize=32)
+def _getTransformer(srcWkt: str, dstWkt: str) -> Transformer:
+    """Cached pyproj Transformer between two CRS given as WKT."""
+    return Transformer.from_crs(srcWkt, dstWkt, always_xy=True)
+
+
+def _planarAreas(gdf: gpd.GeoDataFrame, dstCrs) -> np.ndarray:
+    """Areas of ``gdf`` geometries measured in ``dstCrs``."""
+    geoms = gdf.geometry.to_numpy()
+    if gdf.crs is None:
+        raise ValueError("Cannot compute areas of geometries without a CRS.")
+    dstCrs = CRS.from_user_input(dstCrs)
+    if gdf.crs == dstCrs:
+        return shapely.area(geoms)
+    tr = _getTransformer(gdf.crs.to_wkt(), dstCrs.to_wkt())
+    return shapely.area(shapely.transform(geoms, lambda xy: np.column_stack(tr.transform(xy[:, 0], xy[:, 1]))))
+
+
 def attachAreasMetersNoGeomChange(gdf: gpd.GeoDataFrame, demCrs) -> gpd.GeoDataFrame:
     """Add planar area columns without changing geometry or CRS.
 
+    The columns are set on ``gdf`` in place (no frame copy); the same frame
+    is returned for chaining.
+
     Parameters
     ----------
     gdf : geopandas.GeoDataFrame
@@ -69,19 +101,22 @@ def attachAreasMetersNoGeomChange(gdf: gpd.GeoDataFrame, demCrs) -> gpd.GeoDataF
     """
     try:
         if len(gdf) == 0:
-            return gdf.assign(area_m=[], area_km=[])
-        if getattr(demCrs, "is_projected", None):
-            areaSeries = gdf.to_crs(demCrs).geometry.area
+            areas = np.zeros(0)
+        elif getattr(demCrs, "is_projected", None):
+            areas = _planarAreas(gdf, demCrs)
         else:
             try:
-                areaSeries = gdf.to_crs(gdf.estimate_utm_crs()).geometry.area
+                areas = _planarAreas(gdf, gdf.estimate_utm_crs())
             except Exception:
-                areaSeries = gdf.geometry.area
-        return gdf.assign(area_m=areaSeries.values, area_km=areaSeries.values / 1e6)
+                areas = gdf.geometry.area.values
+        gdf["area_m"] = areas
+        gdf["area_km"] = areas / 1e6
+        return gdf
     except Exception:
         log.exception("Area computation failed; writing zeros without changing geometry.")
-        zeros = np.zeros(len(gdf))
-        return gdf.assign(area_m=zeros, area_km=zeros / 1e6)
+        gdf["area_m"] = 0.0
+        gdf["area_km"] = 0.0
+        return gdf
 
 
 # ----------------------------------------------------------------------
@@ -124,15 +159,50 @@ def readRaster(path: PathLike, return_profile: bool = False) -> Tuple:
     raise FileNotFoundError(f"{p} is not a valid file or folder")
 
 
-def readGeoData(path: PathLike, columns=None) -> gpd.GeoDataFrame:
+def readRasterProfile(path: PathLike) -> dict:
+    """Return the profile of a raster without reading any pixel data."""
+    with rasterio.open(path) as src:
+        return src.profile
+
+
+def readGeoCrs(path: PathLike):
+    """Return the CRS of a vector dataset (``None`` if it has none).
+
+    With pyogrio available only the layer metadata is read, no features.
+    """
+    path = pathlib.Path(path)
+    if _HAS_PYOGRIO and path.suffix.lower() not in (".parquet", ".geoparquet"):
+        crs = pyogrio.read_info(path)["crs"]
+        return CRS.from_user_input(crs) if crs else None
+    return readGeoData(path).crs
+
+
+def readGeoColumns(path: PathLike) -> List[str]:
+    """Return the attribute column names of a vector dataset (geometry excluded).
+
+    With pyogrio available only the layer metadata is read, no features.
+    """
+    path = pathlib.Path(path)
+    if _HAS_PYOGRIO and path.suffix.lower() not in (".parquet", ".geoparquet"):
+        return [str(f) for f in pyogrio.read_info(path)["fields"]]
+    return list(readGeoData(path, readGeometry=False).columns)
+
+
+def readGeoData(path: PathLike, columns=None, readGeometry: bool = True) -> gpd.GeoDataFrame:
     """Read a vector or GeoParquet dataset.
 
+    With pyogrio and pyarrow available, features are read through the GDAL
+    Arrow stream instead of per-feature Python objects.
+
     Parameters
     ----------
     path : str or pathlib.Path
         Input dataset path.
     columns : list, optional
         Columns to read. By default, all columns are read.
+    readGeometry : bool, optional
+        If False, only the attribute table is read and a plain
+        ``pandas.DataFrame`` is returned.
 
     Returns
     -------
@@ -141,14 +211,17 @@ def readGeoData(path: PathLike, columns=None) -> gpd.GeoDataFrame:
     """
     path = pathlib.Path(path)
     if path.suffix.lower() in (".parquet", ".geoparquet"):
-        return gpd.read_parquet(path, columns=columns)
+        gdf = gpd.read_parquet(path, columns=columns)
+        return gdf if readGeometry else pd.DataFrame(gdf.drop(columns=gdf.geometry.name))
     if _HAS_PYOGRIO:
-        return pyogrio.read_dataframe(path, columns=columns)
+        return pyogrio.read_dataframe(
+            path, columns=columns, read_geometry=readGeometry, use_arrow=_HAS_ARROW
+        )
     kwargs = {"columns": columns} if columns is not None else {}
-    return gpd.read_file(path, **kwargs)
+    return gpd.read_file(path, ignore_geometry=not readGeometry, **kwargs)
 
 
-def writeGeoData(gdf: gpd.GeoDataFrame, path: PathLike, driver: str = "GeoJSON") -> None:
+def writeGeoData(gdf: gpd.GeoDataFrame, path: PathLike, driver: str | None = None) -> None:
     """Write a vector or GeoParquet dataset.
 
     Parameters
@@ -158,17 +231,75 @@ def writeGeoData(gdf: gpd.GeoDataFrame, path: PathLike, driver: str = "GeoJSON")
     path : str or pathlib.Path
         Output dataset path.
     driver : str, optional
-        Vector output driver. The default is ``GeoJSON``.
+        Vector output driver. By default it is derived from the file
+        extension (see ``VECTOR_EXTENSIONS``), falling back to ``GeoJSON``.
     """
     path = pathlib.Path(path)
+    if driver is None:
+        driver = _DRIVERS_BY_EXTENSION.get(path.suffix.lower(), "GeoJSON")
     if path.suffix.lower() in (".parquet", ".geoparquet"):
         gdf.to_parquet(path, index=False)
     elif _HAS_PYOGRIO:
+        if _HAS_ARROW:
+            try:
+                pyogrio.write_dataframe(gdf, path, driver=driver, use_arrow=True)
+                return
+            except Exception as e:
+                # e.g. mixed-type object columns Arrow cannot convert
+                log.debug("Arrow write failed for %s (%s); retrying without Arrow", path, e)
         pyogrio.write_dataframe(gdf, path, driver=driver)
     else:
         gdf.to_file(path, driver=driver)
 
 
+def writeCsv(df: pd.DataFrame, path: PathLike) -> None:
+    """Write ``df`` without its index to CSV.
+
+    With pyarrow available the multi-threaded Arrow CSV writer is used
+    (strings are quoted, booleans written as ``true``/``false``); otherwise,
+    or for columns Arrow cannot convert, ``DataFrame.to_csv``.
+    """
+    if _HAS_ARROW:
+        try:
+            table = pyarrow.Table.from_pandas(df, preserve_index=False)
+            pacsv.write_csv(table, path, write_options=pacsv.WriteOptions(quoting_style="needed"))
+            return
+        except Exception as e:
+            log.debug("Arrow CSV write failed for %s (%s); using pandas", path, e)
+    df.to_csv(path, index=False)
+
+
+VECTOR_EXTENSIONS = {
+    "FlatGeobuf": ".fgb",
+    "GPKG": ".gpkg",
+    "GeoJSON": ".geojson",
+    "GeoJSONSeq": ".geojsonl",
+    "ESRI Shapefile": ".shp",
+}
+_DRIVERS_BY_EXTENSION = {ext: drv for drv, ext in VECTOR_EXTENSIONS.items()}
+
+
+def vectorExtension(driver: str) -> str:
+    """Return the file extension (with dot) used for a vector driver."""
+    try:
+        return VECTOR_EXTENSIONS[driver]
+    except KeyError:
+        raise ValueError(
+            f"Unsupported vector driver '{driver}' (expected one of {', '.join(VECTOR_EXTENSIONS)})"
+        ) from None
+
+
+def writeVector(gdf: gpd.GeoDataFrame, basePath: PathLike, driver: str = "FlatGeobuf") -> str:
+    """Write ``gdf`` to ``basePath`` + driver extension and return the path.
+
+    FlatGeobuf (default) is a binary format with a built-in spatial index and
+    is much faster to write and read than GeoJSON or Shapefile.
+    """
+    outPath = f"{basePath}{vectorExtension(driver)}"
+    writeGeoData(gdf, outPath, driver=driver)
+    return outPath
+
+
 def saveRaster(
     refRaster: PathLike,
     outPath: PathLike,
@@ -178,8 +309,13 @@ def saveRaster(
     compress=None,
     tiled=None,
     blocksize=None,
+    **creationOptions,
 ) -> pathlib.Path:
-    """Save raster to GeoTIFF, inheriting CRS/transform from reference raster."""
+    """Save raster to GeoTIFF, inheriting CRS/transform from reference raster.
+
+    Extra keyword arguments are passed on as GTiff creation options
+    (e.g. ``predictor=2``, ``zstd_level=3``, ``num_threads="ALL_CPUS"``).
+    """
     refRaster = pathlib.Path(refRaster)
     outPath = pathlib.Path(outPath)
     outPath.parent.mkdir(parents=True, exist_ok=True)
@@ -205,6 +341,7 @@ def saveRaster(
         if blocksize:
             profile["blockxsize"] = blocksize
             profile["blockysize"] = blocksize
+        profile.update(creationOptions)
 
     with rasterio.open(outPath, "w", **profile) as dst:
         if raster.ndim == 2:
@@ -228,6 +365,14 @@ def createParameterFolders(path: PathLike) -> None:
         (path_inputs / parameter).mkdir(parents=True, exist_ok=True)
 
 
+def outputsUpToDate(outputs, inputs) -> bool:
+    """True if every output exists and is not older than any of the inputs."""
+    if not all(os.path.exists(p) for p in outputs):
+        return False
+    newestInput = max(os.path.getmtime(p) for p in inputs)
+    return min(os.path.getmtime(p) for p in outputs) >= newestInput
+
+
 def makeOutputDir(mainPath: PathLike) -> pathlib.Path:
     """Ensure Outputs/cairos exists and return its path."""
     outPath = pathlib.Path(mainPath) / "Outputs" / "cairos"
@@ -350,8 +495,8 @@ def filterAndWriteForFlowPy(
                             )
 
                         baseName = os.path.basename(inPath)
-                        name, ext = os.path.splitext(baseName)
-                        newName = f"{name}-{bandLabel}-{sizeClass}{ext}"
+                        name = os.path.splitext(baseName)[0]
+                        newName = f"{name}-{bandLabel}-{sizeClass}.geojson"
                         outPath = os.path.join(outDir, newName)
                         gSel.to_file(outPath, driver="GeoJSON")
 
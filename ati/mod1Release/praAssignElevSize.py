@@ -96,9 +96,11 @@ def assignElevationBand(row, bands):
 
 # ------------------ File discovery & naming ------------------ #
 
-def findFilteredGeojsons(praSegmentationDir, streamThreshold, minLength, smoothingWindowSize, sizeFilter):
-    """Locate filtered PRA GeoJSONs based on naming suffix."""
-    suffix = f"_BnCh2_subC{streamThreshold}_{minLength}_{smoothingWindowSize}_sizeF{int(sizeFilter)}.geojson"
+def findFilteredGeojsons(
+    praSegmentationDir, streamThreshold, minLength, smoothingWindowSize, sizeFilter, ext=".fgb"
+):
+    """Locate filtered PRA vectors from Step 05 based on naming suffix."""
+    suffix = f"_BnCh2_subC{streamThreshold}_{minLength}_{smoothingWindowSize}_sizeF{int(sizeFilter)}{ext}"
     pattern = f"*{suffix}"
     return sorted(glob.glob(os.path.join(praSegmentationDir, pattern))), suffix
 
@@ -106,8 +108,9 @@ def findFilteredGeojsons(praSegmentationDir, streamThreshold, minLength, smoothi
 def simplifiedBasename(inputPath, suffix):
     """Strip the long suffix to produce a short, clean base name."""
     base = os.path.splitext(os.path.basename(inputPath))[0]
-    if base.endswith(suffix.replace(".geojson", "")):
-        short = base[: -len(suffix.replace(".geojson", ""))].rstrip("_")
+    stem = os.path.splitext(suffix)[0]
+    if base.endswith(stem):
+        short = base[: -len(stem)].rstrip("_")
         return short
     return base
 
@@ -232,6 +235,7 @@ def runPraAssignElevSize(cfg, workFlowDir):
     minLength = cfg["praSUBCATCHMENTS"].getint("minLength", fallback=100)
     smoothingWindowSize = cfg["praSUBCATCHMENTS"].getint("smoothingWindowSize", fallback=5)
     sizeFilter = cfg["praSEGMENTATION"].getfloat("sizeFilter", fallback=500.0)
+    vectorDriver = cfg["praSEGMENTATION"].get("vectorDriver", fallback="FlatGeobuf")
 
     inputDir = workFlowDir["inputDir"]
     demPath = os.path.join(inputDir, cfg["MAIN"].get("DEM", "").strip())
@@ -251,7 +255,12 @@ def runPraAssignElevSize(cfg, workFlowDir):
     microRegions = gpd.read_file(avaReportPath).to_crs(demCrs)
 
     filteredFiles, longSuffix = findFilteredGeojsons(
-        praSegmentationDir, streamThreshold, minLength, smoothingWindowSize, sizeFilter
+        praSegmentationDir,
+        streamThreshold,
+        minLength,
+        smoothingWindowSize,
+        sizeFilter,
+        dataUtils.vectorExtension(vectorDriver),
     )
     targetDir = praAssignElevSizeDir
 
@@ -261,7 +270,7 @@ def runPraAssignElevSize(cfg, workFlowDir):
     log.info("DEM: ./%s", dataUtils.relPath(demPath, cairosDir))
 
     if not filteredFiles:
-        log.error("No filtered GeoJSONs found matching *%s in ./%s",
+        log.error("No filtered PRA vectors found matching *%s in ./%s",
                   longSuffix, dataUtils.relPath(praSegmentationDir, cairosDir))
         return
 
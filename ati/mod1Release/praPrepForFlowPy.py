@@ -83,13 +83,14 @@ def _findStep07Inputs(
     praAssignElevSizeDir,
     assignElevSize,
     sizeFilter,
+    segmentationExt=".fgb",
 ):
     """Locate flat Step 06 outputs for the selected workflow input type."""
     inDir = pathlib.Path(praAssignElevSizeDir)
     if assignElevSize:
         pattern = "*-ElevBands-Sized.geojson"
     else:
-        pattern = f"*sizeF{int(sizeFilter)}.geojson"
+        pattern = f"*sizeF{int(sizeFilter)}{segmentationExt}"
     inFiles = sorted(glob.glob(os.path.join(inDir, pattern)))
     return inDir, inFiles
 
@@ -294,6 +295,7 @@ def runPraPrepForFlowPy(cfg, workFlowDir=None, avaDir=None):
         praAssignElevSizeDir,
         cfg["praPREPFORFLOWPY"].getboolean("assignElevSize"),
         sizeFilter,
+        dataUtils.vectorExtension(cfg["praSEGMENTATION"].get("vectorDriver", fallback="FlatGeobuf")),
     )
     if not inFiles:
         log.error("Step 07: No Step 06 inputs found in ./%s", dataUtils.relPath(inDir, cairosDir))
@@ -14,13 +14,15 @@
 #     - Cleaned PRA rasters:
 #         * <name>_BnCh1.tif   (pass 1: direct-neighbor connectivity)
 #         * <name>_BnCh2.tif   (pass 2: diagonal-neighbor refinement)
-#     - PRA GeoJSON polygons representing the cleaned regions
+#     - PRA polygons representing the cleaned regions
+#       (FlatGeobuf by default, see [praPROCESSING] vectorDriver)
 #
 # Config :
 #     [praPROCESSING]
 #         • Connectivity thresholds (pass 1 / pass 2)
 #         • Mask behavior and nodata handling
 #         • Output compression settings
+#         • Vector output driver (FlatGeobuf | GPKG | GeoJSON)
 #
 # Consumes :
 #     - PRA masks produced in Step 02
@@ -49,11 +51,9 @@ import time
 import logging
 import numpy as np
 from typing import cast
-from scipy.ndimage import convolve
 import rasterio
 from rasterio.features import shapes
 import geopandas as gpd
-from shapely.geometry import shape
 import pathlib
 
 import ati
@@ -66,6 +66,85 @@ import avaframe.in3Utils.cfgUtils as cfgUtils
 log = logging.getLogger(__name__)
 
 # ------------------ Cleaning ------------------ #
+#
+# The binary PRA masks are cleaned on bit-packed rows (np.packbits, MSB =
+# leftmost pixel): every byte holds 8 cells, so the neighbour shifts and the
+# bit-sliced neighbour count below move 8x fewer bytes than a uint8
+# convolution. Cells outside the raster count as 0 (like mode="constant").
+
+
+def _packedShiftN(p):
+    """Each cell takes the value of its northern neighbour (row above)."""
+    out = np.zeros_like(p)
+    out[1:] = p[:-1]
+    return out
+
+
+def _packedShiftS(p):
+    """Each cell takes the value of its southern neighbour (row below)."""
+    out = np.zeros_like(p)
+    out[:-1] = p[1:]
+    return out
+
+
+def _packedShiftE(p):
+    """Each cell takes the value of its eastern neighbour (next column)."""
+    out = p << 1
+    out[:, :-1] |= p[:, 1:] >> 7
+    return out
+
+
+def _packedShiftW(p):
+    """Each cell takes the value of its western neighbour (previous column)."""
+    out = p >> 1
+    out[:, 1:] |= p[:, :-1] << 7
+    return out
+
+
+def _packedAtLeast(a, b, c, d, k):
+    """Bitwise ``a + b + c + d >= k`` for four packed bit planes."""
+    if k <= 0:
+        return np.full_like(a, 0xFF)
+    if k > 4:
+        return np.zeros_like(a)
+    # bit-sliced adder: count = 4*b2 + 2*b1 + b0
+    s1, c1 = a ^ b, a & b
+    s2, c2 = c ^ d, c & d
+    b0, carry = s1 ^ s2, s1 & s2
+    b1 = c1 ^ c2 ^ carry
+    b2 = c1 & c2
+    if k == 1:
+        return b0 | b1 | b2
+    if k == 2:
+        return b1 | b2
+    if k == 3:
+        return b2 | (b1 & b0)
+    return b2
+
+
+def cleanMaskPacked(mask, p1_min, p2_min):
+    """
+    Two-pass neighbourhood cleaning on a bit-packed binary mask.
+
+    Returns (mask1, mask2) as uint8 0/1 arrays, identical to keeping cells
+    with >= p1_min direct (N/E/S/W) neighbours, then >= p2_min diagonal
+    neighbours among the pass-1 cells.
+    """
+    width = mask.shape[1]
+    packed = np.packbits(mask > 0, axis=1)
+
+    packed1 = packed & _packedAtLeast(
+        _packedShiftN(packed), _packedShiftS(packed), _packedShiftE(packed), _packedShiftW(packed), p1_min
+    )
+
+    east, west = _packedShiftE(packed1), _packedShiftW(packed1)
+    packed2 = packed1 & _packedAtLeast(
+        _packedShiftN(east), _packedShiftN(west), _packedShiftS(east), _packedShiftS(west), p2_min
+    )
+
+    mask1 = np.unpackbits(packed1, axis=1, count=width)
+    mask2 = np.unpackbits(packed2, axis=1, count=width)
+    return mask1, mask2
 
 
 def runPraCleaning(cfg, cairosDir, outDir, demPath, selectedFiles):
@@ -79,6 +158,19 @@ def runPraCleaning(cfg, cairosDir, outDir, demPath, selectedFiles):
 
     p1_min = cfg["praPROCESSING"].getint("minDirectNeighborsPass1", fallback=3)
     p2_min = cfg["praPROCESSING"].getint("minDiagonalNeighborsPass2", fallback=2)
+    compress = cfg["praPROCESSING"].get("outputCompression", fallback="ZSTD")
+
+    # Tiled uint8 masks with horizontal differencing compress well and
+    # encode/decode much faster than untiled single-threaded DEFLATE.
+    tiffOptions = dict(
+        compress=compress,
+        tiled=True,
+        blocksize=512,
+        predictor=2,
+        num_threads="ALL_CPUS",
+    )
+    if compress.upper() == "ZSTD":
+        tiffOptions["zstd_level"] = 3
 
     log.info(
         "Step 04: PRA cleaning start (pass1=%d, pass2=%d, nFiles=%d)",
@@ -87,11 +179,10 @@ def runPraCleaning(cfg, cairosDir, outDir, demPath, selectedFiles):
         len(selectedFiles),
     )
 
-    edgeKernel1 = np.array([[0, 1, 0], [1, 0, 1], [0, 1, 0]], dtype=np.uint8)
-    edgeKernel2 = np.array([[1, 0, 1], [0, 0, 0], [1, 0, 1]], dtype=np.uint8)
-
     cleaned_final = []
     n_clean, n_fallback = 0, 0
+    # relPath is evaluated eagerly; skip it for debug messages that are dropped
+    debugLog = log.isEnabledFor(logging.DEBUG)
 
     for inPath in selectedFiles:
         try:
@@ -99,32 +190,19 @@ def runPraCleaning(cfg, cairosDir, outDir, demPath, selectedFiles):
             log.info("Cleaning PRA: ./%s", relIn)
             arr, _prof = dataUtils.readRaster(inPath, return_profile=True)
 
-            mask = (arr > 0).astype(np.uint8)
-
-            # Pass 1: direct neighbors
-            with timeIt("Pass1 - direct neighbors"):
-                n1 = convolve(mask, edgeKernel1, mode="constant", cval=0)
-                mask1 = mask.copy()
-                mask1[n1 < p1_min] = 0
+            with timeIt("Pass1/2 - direct and diagonal neighbors (packed)"):
+                mask1, mask2 = cleanMaskPacked(arr, p1_min, p2_min)
 
             base = os.path.splitext(os.path.basename(inPath))[0]
             out1 = os.path.join(outDir, f"{base}_BnCh1.tif")
-            dataUtils.saveRaster(
-                demPath, out1, mask1, dtype="uint8", nodata=0, compress="DEFLATE"
-            )
-            log.debug("Saved: ./%s", relPath(out1, cairosDir))
-
-            # Pass 2: diagonal neighbors
-            with timeIt("Pass2 - diagonal neighbors"):
-                n2 = convolve(mask1, edgeKernel2, mode="constant", cval=0)
-                mask2 = mask1.copy()
-                mask2[n2 < p2_min] = 0
+            dataUtils.saveRaster(demPath, out1, mask1, dtype="uint8", nodata=0, **tiffOptions)
+            if debugLog:
+                log.debug("Saved: ./%s", relPath(out1, cairosDir))
 
             out2 = os.path.join(outDir, f"{base}_BnCh2.tif")
-            dataUtils.saveRaster(
-                demPath, out2, mask2, dtype="uint8", nodata=0, compress="DEFLATE"
-            )
-            log.debug("Saved: ./%s", relPath(out2, cairosDir))
+            dataUtils.saveRaster(demPath, out2, mask2, dtype="uint8", nodata=0, **tiffOptions)
+            if debugLog:
+                log.debug("Saved: ./%s", relPath(out2, cairosDir))
 
             cleaned_final.append(out2)
             n_clean += 1
@@ -149,34 +227,28 @@ def rasterToPolygons(path, includeZero: bool = False) -> gpd.GeoDataFrame:
     """
     Convert a raster to polygons (masking nodata).
     Returns a GeoDataFrame with ['value', 'geometry'].
+
+    Zero cells are excluded via the ``shapes`` mask (unless ``includeZero``),
+    so only positive runs are traced, and all features are assembled into
+    the GeoDataFrame in a single ``from_features`` call.
     """
     with rasterio.open(path) as src:
         arr = src.read(1)
         xform = src.transform
         crs = src.crs
         nodata = src.nodata
-        mask = arr != nodata if nodata is not None else None
 
-        if includeZero:
-            gen = (
-                {"properties": {"value": v}, "geometry": geom}
-                for geom, v in shapes(arr, mask=mask, transform=xform)
-            )
-        else:
-            gen = (
-                {"properties": {"value": v}, "geometry": geom}
-                for geom, v in shapes(arr, mask=mask, transform=xform)
-                if v > 0
-            )
+    mask = arr != nodata if nodata is not None else None
+    if not includeZero:
+        mask = arr > 0 if mask is None else mask & (arr > 0)
 
-        geoms = []
-        vals = []
-        for item in gen:
-            geoms.append(shape(item["geometry"]))
-            vals.append(item["properties"]["value"])
+    features = [
+        {"type": "Feature", "properties": {"value": v}, "geometry": geom}
+        for geom, v in shapes(arr, mask=mask, transform=xform)
+    ]
 
     # Pylance doesn’t understand GeoPandas constructors -> ignore type
-    gdf = gpd.GeoDataFrame({"value": vals, "geometry": geoms}, crs=crs)  # type: ignore[arg-type]
+    gdf = gpd.GeoDataFrame.from_features(features, crs=crs, columns=["value", "geometry"])  # type: ignore[arg-type]
     return gdf
 
 
@@ -219,7 +291,7 @@ def runPraProcessing(cfg, workFlowDir=None, avaDir=None):
         demPath = getInput.getDEMPath(avaDir)
 
     # --- DEM reference ---
-    dem, demProfile = dataUtils.readRaster(demPath, return_profile=True)
+    demProfile = dataUtils.readRasterProfile(demPath)
     demNoData = demProfile.get("nodata", 0)
     cellSize = demProfile["transform"][0]
     crsName = demProfile["crs"]
@@ -255,45 +327,47 @@ def runPraProcessing(cfg, workFlowDir=None, avaDir=None):
         log.error("Step 04 failed (no matching rasters)")
         return
 
-    # --- Metadata consistency check ---
+    # --- Metadata consistency check (profile only; pixels are read in cleaning) ---
+    # Step 02 masks are uint8/255; int16/-9999 is accepted from older runs
+    maskNoData = {"uint8": 255, "int16": -9999}
     for f in selectedFiles:
-        arr, prof = dataUtils.readRaster(f, return_profile=True)
-        relF = relPath(f, cairosDir)
+        prof = dataUtils.readRasterProfile(f)
+        issues = []
         if prof["crs"] != demProfile["crs"]:
-            log.warning("CRS mismatch for ./%s", relF)
+            issues.append("CRS mismatch")
         if prof["transform"] != demProfile["transform"]:
-            log.warning("Transform mismatch for ./%s", relF)
+            issues.append("Transform mismatch")
         if (prof["width"], prof["height"]) != (
             demProfile["width"],
             demProfile["height"],
         ):
-            log.warning("Dimension mismatch for ./%s", relF)
-        if prof.get("nodata") != demProfile.get("nodata"):
-            log.warning("NoData mismatch for ./%s", relF)
-        if prof["dtype"] != "int16":
-            log.warning(
-                "Unexpected dtype for ./%s (expected int16, got %s)",
-                relF,
-                prof["dtype"],
-            )
+            issues.append("Dimension mismatch")
+        if prof["dtype"] not in maskNoData:
+            issues.append(f"Unexpected dtype (expected uint8, got {prof['dtype']})")
+        elif prof.get("nodata") != maskNoData[prof["dtype"]]:
+            issues.append("NoData mismatch")
+        if issues:
+            relF = relPath(f, cairosDir)
+            for issue in issues:
+                log.warning("%s for ./%s", issue, relF)
 
     # --- Cleaning ---
     with timeIt("Step 04: PRA Cleaning"):
         cleanedFiles = runPraCleaning(cfg, cairosDir, outDir, demPath, selectedFiles)
 
-    # --- Polygonization to GeoJSON ---
+    # --- Polygonization to vector ---
+    vectorDriver = cfg["praPROCESSING"].get("vectorDriver", fallback="FlatGeobuf")
     with timeIt("Step 04: Polygonization"):
         n_ok, n_fail = 0, 0
 
         for inPath in cleanedFiles:
             try:
                 base = os.path.splitext(os.path.basename(inPath))[0]
-                geojsonPath = os.path.join(outDir, f"{base}.geojson")
 
                 gdf = rasterToPolygons(inPath, includeZero=False)
                 gdf = calcPolygonProperties(cast(gpd.GeoDataFrame, gdf))
-                gdf.to_file(geojsonPath, driver="GeoJSON")  # type: ignore[attr-defined]
-                log.info("Polygonized → ./%s", relPath(geojsonPath, cairosDir))
+                vecPath = dataUtils.writeVector(gdf, os.path.join(outDir, base), driver=vectorDriver)
+                log.info("Polygonized → ./%s", relPath(vecPath, cairosDir))
                 n_ok += 1
             except Exception:
                 log.exception(
@@ -7,18 +7,20 @@
 #     elevation and size assignment.
 #
 # Inputs :
-#     - Cleaned PRA polygons (GeoJSONs) from Step 04
+#     - Cleaned PRA polygons from Step 04
 #     - Subcatchment polygons (SHP/GeoJSON) from Step 03
 #
 # Outputs :
-#     - Segmented PRA GeoJSONs (PRA × subcatchment intersections)
-#     - Size-filtered PRA GeoJSONs according to segmentation thresholds
+#     - Segmented PRA polygons (PRA × subcatchment intersections)
+#     - Size-filtered PRA polygons according to segmentation thresholds
+#       (FlatGeobuf by default, see [praSEGMENTATION] vectorDriver)
 #
 # Config :
 #     [praSEGMENTATION]
 #         • sizeClass definitions
 #         • minimum area thresholds
 #         • optional filters for small objects
+#         • vector output driver (FlatGeobuf | GPKG | GeoJSON)
 #
 # Consumes :
 #     - Cleaned PRA polygons produced in Step 04
@@ -46,9 +48,19 @@ import os
 import glob
 import time
 import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import numpy as np
 import geopandas as gpd
+import shapely
 import pathlib
 
+try:
+    import dask_geopandas as dgpd
+
+    _HAS_DASK_GEOPANDAS = True
+except Exception:
+    _HAS_DASK_GEOPANDAS = False
+
 import ati
 import ati.mod0Helper.dataUtils as dataUtils
 from ati.mod0Helper.cfgUtils import parseRangeCsv
@@ -63,9 +75,9 @@ logging.getLogger("fiona").setLevel(logging.ERROR)
 # ------------------ Helper functions ------------------ #
 
 
-def findPraFiles(praProcessingDir: str, code3: str):
-    """Find polygonized PRA GeoJSONs from Step 04 (code like '030')."""
-    pattern = f"pra{code3}*.geojson"
+def findPraFiles(praProcessingDir: str, code3: str, ext: str = ".fgb"):
+    """Find polygonized PRA vectors from Step 04 (code like '030')."""
+    pattern = f"pra{code3}*{ext}"
     return sorted(glob.glob(os.path.join(praProcessingDir, pattern)))
 
 
@@ -82,24 +94,30 @@ def buildSubcatchSmoothedPath(
     return os.path.join(praSubcatchmentsDir, fname)
 
 
-def ensureGeojsonVersion(src_path: str) -> str:
+def ensureVectorVersion(src_path: str, driver: str = "FlatGeobuf") -> str:
     """
-    Convert SHP → GeoJSON if not already GeoJSON.
-    Returns path to the GeoJSON file.
+    Convert SHP → ``driver`` (FlatGeobuf by default, or GeoJSON) if needed.
+    Returns path to the file with that driver's extension; an existing
+    conversion that is not older than the source is reused as is.
     """
-    if src_path.lower().endswith(".geojson"):
+    ext = dataUtils.vectorExtension(driver)
+    if src_path.lower().endswith(ext):
         return src_path
-    geojson_path = os.path.splitext(src_path)[0] + ".geojson"
+    out_path = os.path.splitext(src_path)[0] + ext
+    if os.path.exists(out_path) and os.path.getmtime(out_path) >= os.path.getmtime(src_path):
+        log.debug("Reusing converted subcatchments: ./%s", dataUtils.relPath(out_path, os.getcwd()))
+        return out_path
     try:
-        gdf = gpd.read_file(src_path)
-        gdf.to_file(geojson_path, driver="GeoJSON")
+        gdf = dataUtils.readGeoData(src_path)
+        dataUtils.writeGeoData(gdf, out_path, driver=driver)
         log.info(
-            "Converted subcatchments shapefile to GeoJSON: ./%s",
-            dataUtils.relPath(geojson_path, os.getcwd()),
+            "Converted subcatchments shapefile to %s: ./%s",
+            driver,
+            dataUtils.relPath(out_path, os.getcwd()),
         )
-        return geojson_path
+        return out_path
     except Exception:
-        log.exception("Failed to convert shapefile → GeoJSON: %s", src_path)
+        log.exception("Failed to convert shapefile → %s: %s", driver, src_path)
         raise
 
 
@@ -113,34 +131,136 @@ def loadSizeClasses(cfg):
     return sizeClasses
 
 
+def sizeClassIndex(areasSqm, sizeClasses):
+    """Position of each area (m²) in ``sizeClasses``, -1 if none; first matching class wins.
+
+    Contiguous ascending classes (each upper bound is the next lower bound, as
+    in the default config) are binned in a single searchsorted pass.
+    """
+    areas = np.asarray(areasSqm, dtype=np.float64)
+    bounds = list(sizeClasses.values())
+    if bounds and all(lo < hi for lo, hi in bounds) and all(
+        bounds[i][1] == bounds[i + 1][0] for i in range(len(bounds) - 1)
+    ):
+        edges = np.array([lo for lo, _ in bounds] + [bounds[-1][1]], dtype=np.float64)
+        idx = np.searchsorted(edges, areas, side="right") - 1
+        idx[idx >= len(bounds)] = -1
+        return idx
+
+    # overlapping or gapped classes: first matching class wins
+    idx = np.full(areas.shape, -1, dtype=np.intp)
+    for i, (lo, hi) in enumerate(bounds):
+        idx[(idx < 0) & (areas >= lo) & (areas < hi)] = i
+    return idx
+
+
+def countSizeClasses(classIdx, sizeClasses):
+    """Counts per size class id from ``sizeClassIndex`` positions."""
+    counts = np.bincount(classIdx[classIdx >= 0], minlength=len(sizeClasses))
+    return dict(zip(sizeClasses, counts.tolist()))
+
+
 def classifyAreasSqm(areasSqm, sizeClasses):
-    counts = {k: 0 for k in sizeClasses}
-    for a in areasSqm:
-        for cid, (lo, hi) in sizeClasses.items():
-            if lo <= a < hi:
-                counts[cid] += 1
-                break
-    return counts
-
-
-def applySizeFilter(inputGeoPath, sizeFilter, outBasePath, cairosDir, sizeClasses):
-    """Keep only features ≥ sizeFilter (m²). Output GeoJSON."""
-    gdf = gpd.read_file(inputGeoPath)
-    if "area_m" not in gdf.columns:
-        gdf["area_m"] = gdf.geometry.area
-    gdfFiltered = gdf[gdf["area_m"] >= float(sizeFilter)]
-
-    outGeo = f"{outBasePath}.geojson"
-    gdfFiltered.to_file(outGeo, driver="GeoJSON")
-    filteredClasses = classifyAreasSqm(gdfFiltered["area_m"].astype(float).tolist(), sizeClasses)
+    """Count areas (list or ndarray, m²) per size class; first matching class wins."""
+    return countSizeClasses(sizeClassIndex(areasSqm, sizeClasses), sizeClasses)
+
+
+def applySizeFilter(
+    gdf, classIdx, sizeFilter, outBasePath, cairosDir, sizeClasses, vectorDriver="FlatGeobuf"
+):
+    """Keep only features ≥ sizeFilter (m²). Output written with ``vectorDriver``.
 
+    ``gdf`` is the in-memory segmentation result (with ``area_m``) and
+    ``classIdx`` its ``sizeClassIndex``, so filtered class counts come from a
+    mask instead of a reread and reclassification. Nothing is written when no
+    feature passes the filter (``outGeo`` is None).
+    Returns (kept, outGeo, filteredClasses, sumAreaSqmFiltered).
+    """
+    areas = gdf["area_m"].to_numpy()
+    keep = areas >= float(sizeFilter)
+    kept = int(np.count_nonzero(keep))
+    filteredClasses = countSizeClasses(classIdx[keep], sizeClasses)
+
+    if kept == 0:
+        log.info("...size filter %.0f m² → kept=0, nothing written", sizeFilter)
+        return 0, None, filteredClasses, 0.0
+
+    outGeo = dataUtils.writeVector(gdf[keep], outBasePath, driver=vectorDriver)
     log.info(
         "...size filter %.0f m² → kept=%d, out=./%s",
         sizeFilter,
-        len(gdfFiltered),
+        kept,
         dataUtils.relPath(outGeo, cairosDir),
     )
-    return len(gdfFiltered), outGeo, filteredClasses
+    return kept, outGeo, filteredClasses, float(areas[keep].sum())
+
+
+def _validGeoms(geoms):
+    """Repair invalid geometries with make_valid, as overlay(make_valid=True) does."""
+    invalid = ~shapely.is_valid(geoms)
+    if invalid.any():
+        geoms = geoms.copy()
+        geoms[invalid] = shapely.make_valid(geoms[invalid])
+    return geoms, bool(invalid.any())
+
+
+def _polygonalIntersections(praGeoms, subcGeoms, idxPra, idxSub, crs):
+    """Intersect matched PRA/subcatchment pairs and keep single polygons.
+
+    Equivalent to ``overlay(..., keep_geom_type=True)`` followed by
+    ``explode``: polygon parts of multi-polygons and geometry collections are
+    kept, lower-dimensional slivers and empties are dropped.
+    """
+    geoms = shapely.intersection(praGeoms[idxPra], subcGeoms[idxSub])
+    typeIds = shapely.get_type_id(geoms)
+    # most pieces are single polygons already; only split when needed
+    if ((typeIds == 6) | (typeIds == 7)).any():
+        # two passes: collections may hold multi-polygons
+        geoms = shapely.get_parts(shapely.get_parts(geoms))
+        typeIds = shapely.get_type_id(geoms)
+    geoms = geoms[(typeIds == 3) & ~shapely.is_empty(geoms)]
+    return gpd.GeoDataFrame(geometry=geoms, crs=crs)
+
+
+def overlayIntersection(praGdf, subcGdf):
+    """PRA × subcatchment intersection via a bulk spatial-index query.
+
+    One bounding-box query against the subcatchment index culls PRAs that
+    touch no subcatchment; only the remaining candidates are validated and
+    tested with ``intersects``. The matching pairs are intersected in one
+    vectorized shapely call instead of geopandas' row-wise overlay assembly.
+    """
+    subcGeoms, repaired = _validGeoms(subcGdf.geometry.to_numpy())
+    tree = shapely.STRtree(subcGeoms) if repaired else subcGdf.sindex
+    idxPra, idxSub = tree.query(praGdf.geometry.to_numpy())
+    candidates, idxCand = np.unique(idxPra, return_inverse=True)
+    praGeoms, _ = _validGeoms(praGdf.geometry.to_numpy()[candidates])
+    hit = shapely.intersects(praGeoms[idxCand], subcGeoms[idxSub])
+    return _polygonalIntersections(praGeoms, subcGeoms, idxCand[hit], idxSub[hit], praGdf.crs)
+
+
+def overlayIntersectionDask(praGdf, subcGdf, nPartitions=4):
+    """PRA × subcatchment intersection on spatially partitioned PRAs (dask-geopandas).
+
+    PRAs are Hilbert-shuffled into ``nPartitions`` spatially compact chunks and
+    joined against the subcatchments with an ``intersects`` sjoin; the matched
+    pairs are then intersected as in :func:`overlayIntersection`.
+    """
+    praGeoms, _ = _validGeoms(praGdf.geometry.to_numpy())
+    subcGeoms, _ = _validGeoms(subcGdf.geometry.to_numpy())
+    praD = dgpd.from_geopandas(
+        gpd.GeoDataFrame({"praIdx": np.arange(len(praGeoms))}, geometry=praGeoms, crs=praGdf.crs),
+        npartitions=nPartitions,
+    )
+    praD = praD.spatial_shuffle()
+    pairs = praD.sjoin(gpd.GeoDataFrame(geometry=subcGeoms, crs=praGdf.crs), predicate="intersects").compute()
+    return _polygonalIntersections(
+        praGeoms,
+        subcGeoms,
+        pairs["praIdx"].to_numpy(),
+        pairs["index_right"].to_numpy(),
+        praGdf.crs,
+    )
 
 
 # ------------------ Core per-file operation ------------------ #
@@ -156,47 +276,121 @@ def processSinglePraLayer(
     cairosDir: str,
     sizeClasses,
     demCrs,
+    vectorDriver="FlatGeobuf",
+    daskPartitions=0,
 ):
-    """Overlay PRA × subcatchments; compute areas and save GeoJSON."""
+    """Overlay PRA × subcatchments; compute areas and save with ``vectorDriver``.
+
+    With ``daskPartitions > 0`` the overlay runs through
+    :func:`overlayIntersectionDask` instead of :func:`overlayIntersection`.
+    Returns (outPath, clipped, classIdx); all None if nothing was written.
+    """
     try:
         with dataUtils.timeIt(f"processSinglePraLayer({os.path.basename(inPath)})"):
-            praGdf = gpd.read_file(inPath)
+            praGdf = dataUtils.readGeoData(inPath, columns=[])
 
             subcUse = subcatchGdf.to_crs(praGdf.crs) if subcatchGdf.crs != praGdf.crs else subcatchGdf
-            clipped = gpd.overlay(praGdf, subcUse, how="intersection", keep_geom_type=True)
+            if daskPartitions > 0:
+                clipped = overlayIntersectionDask(praGdf, subcUse, daskPartitions)
+            else:
+                clipped = overlayIntersection(praGdf, subcUse)
 
             if clipped.empty:
                 log.debug("No intersection for ./%s", dataUtils.relPath(inPath, cairosDir))
-                return None, 0, 0.0, {k: 0 for k in sizeClasses}
+                return None, None, None
 
-            clipped = clipped.explode(index_parts=True).reset_index(drop=True)
-            clipped = clipped[["geometry"]]
             clipped = dataUtils.attachAreasMetersNoGeomChange(clipped, demCrs)
-            classCounts = classifyAreasSqm(clipped["area_m"].astype(float).tolist(), sizeClasses)
+            classIdx = sizeClassIndex(clipped["area_m"].to_numpy(), sizeClasses)
 
             base = os.path.splitext(os.path.basename(inPath))[0]
-            outPath = os.path.join(
-                outDir,
-                f"{base}_subC{streamThreshold}_{minLength}_{smoothingWindowSize}.geojson",
+            outPath = dataUtils.writeVector(
+                clipped,
+                os.path.join(outDir, f"{base}_subC{streamThreshold}_{minLength}_{smoothingWindowSize}"),
+                driver=vectorDriver,
             )
-            clipped.to_file(outPath, driver="GeoJSON")
 
             log.info(
                 "Segmented PRA → ./%s (%d polys)",
                 dataUtils.relPath(outPath, cairosDir),
                 len(clipped),
             )
-            return outPath, len(clipped), float(clipped["area_m"].sum()), classCounts
+            return outPath, clipped, classIdx
     except Exception:
         log.exception("Segmentation failed for ./%s", dataUtils.relPath(inPath, cairosDir))
-        return None, 0, 0.0, {k: 0 for k in sizeClasses}
+        return None, None, None
+
+
+def segmentAndFilterPraLayer(
+    inPath: str,
+    subcatchGdf: gpd.GeoDataFrame,
+    outDir: str,
+    streamThreshold: int,
+    minLength: int,
+    smoothingWindowSize: int,
+    cairosDir: str,
+    sizeClasses,
+    demCrs,
+    sizeFilter: float,
+    vectorDriver="FlatGeobuf",
+    daskPartitions=0,
+):
+    """Segment one PRA file and apply the size filter (thread-pool worker).
+
+    Returns (outPath, nPolys, sumAreaSqm, classCounts,
+    kept, outGeo, filteredClasses, sumAreaSqmFiltered).
+    """
+    outPath, clipped, classIdx = processSinglePraLayer(
+        inPath,
+        subcatchGdf,
+        outDir,
+        streamThreshold,
+        minLength,
+        smoothingWindowSize,
+        cairosDir,
+        sizeClasses,
+        demCrs,
+        vectorDriver,
+        daskPartitions,
+    )
+    noCounts = {k: 0 for k in sizeClasses}
+    if not outPath:
+        return None, 0, 0.0, noCounts, 0, None, noCounts, 0.0
+    classCounts = countSizeClasses(classIdx, sizeClasses)
+    sumAreaSqm = float(clipped["area_m"].sum())
+
+    baseNoExt = os.path.splitext(os.path.basename(inPath))[0]
+    filteredBase = os.path.join(
+        outDir,
+        f"{baseNoExt}_subC{streamThreshold}_{minLength}_{smoothingWindowSize}_sizeF{int(sizeFilter)}",
+    )
+    kept, outGeo, filteredClasses, sumAreaSqmFiltered = applySizeFilter(
+        clipped, classIdx, sizeFilter, filteredBase, cairosDir, sizeClasses, vectorDriver
+    )
+    return outPath, len(clipped), sumAreaSqm, classCounts, kept, outGeo, filteredClasses, sumAreaSqmFiltered
+
+
+# Subcatchments (by PRA CRS) shared by all tasks of a process-pool worker
+_workerSubcatchByCrs = {}
+
+
+def _initSegmentationWorker(subcatchByCrs):
+    """Process-pool initializer: keep subcatchments (and their sindex) per worker."""
+    global _workerSubcatchByCrs
+    _workerSubcatchByCrs = subcatchByCrs
+    for gdf in subcatchByCrs.values():
+        _ = gdf.sindex
+
+
+def _segmentAndFilterInWorker(inPath, crsKey, *args):
+    """Process-pool task: segmentAndFilterPraLayer against the worker's subcatchments."""
+    return segmentAndFilterPraLayer(inPath, _workerSubcatchByCrs[crsKey], *args)
 
 
 # ------------------ Main driver ------------------ #
 
 
 def runPraSegmentation(cfg, workFlowDir=None, avaDir=None):
-    """Step 05: PRA segmentation (PRA GeoJSON × subcatchment SHP)."""
+    """Step 05: PRA segmentation (PRA polygons × subcatchment SHP)."""
     tAll = time.perf_counter()
 
     if workFlowDir is not None:
@@ -242,8 +436,26 @@ def runPraSegmentation(cfg, workFlowDir=None, avaDir=None):
 
     sizeClasses = loadSizeClasses(cfg)
     sizeFilter = cfg["praSEGMENTATION"].getfloat("sizeFilter", fallback=500.0)
+    vectorDriver = cfg["praSEGMENTATION"].get("vectorDriver", fallback="FlatGeobuf")
+    nWorkers = cfg["praSEGMENTATION"].getint("nWorkers", fallback=min(8, os.cpu_count() or 1))
+    poolType = cfg["praSEGMENTATION"].get("poolType", fallback="thread").strip().lower()
+    if poolType not in ("thread", "process"):
+        log.warning("Step 05: unknown poolType '%s'; using thread", poolType)
+        poolType = "thread"
+    daskPartitions = 0
+    if cfg["praSEGMENTATION"].getboolean("useDask", fallback=False):
+        if _HAS_DASK_GEOPANDAS:
+            daskPartitions = cfg["praSEGMENTATION"].getint("daskPartitions", fallback=nWorkers)
+            # dask schedules the partitions itself; avoid nesting it in the worker pool
+            nWorkers = 1
+            poolType = "thread"
+        else:
+            log.warning(
+                "Step 05: useDask=True but dask-geopandas is not installed; using overlayIntersection (STRtree)"
+            )
+    praDriver = cfg["praPROCESSING"].get("vectorDriver", fallback="FlatGeobuf")
 
-    praFiles = findPraFiles(praProcessingDir, code3)
+    praFiles = findPraFiles(praProcessingDir, code3, dataUtils.vectorExtension(praDriver))
     subcatchPath = buildSubcatchSmoothedPath(
         praSubcatchmentsDir,
         streamThreshold,
@@ -259,18 +471,18 @@ def runPraSegmentation(cfg, workFlowDir=None, avaDir=None):
     )
 
     if not praFiles:
-        log.error("No PRA GeoJSONs found in ./%s", dataUtils.relPath(praProcessingDir, cairosDir))
+        log.error("No PRA polygons found in ./%s", dataUtils.relPath(praProcessingDir, cairosDir))
         return
     if not os.path.exists(subcatchPath):
         log.error("Subcatchments file missing: ./%s", dataUtils.relPath(subcatchPath, cairosDir))
         return
 
-    # --- Convert SHP → GeoJSON if necessary ---
-    subcatchGeo = ensureGeojsonVersion(subcatchPath)
+    # --- Convert SHP → FlatGeobuf if necessary (reused while up to date) ---
+    subcatchGeo = ensureVectorVersion(subcatchPath)
 
     # --- Load subcatchments ---
     try:
-        subcatchGdf = gpd.read_file(subcatchGeo)
+        subcatchGdf = dataUtils.readGeoData(subcatchGeo, columns=[])
     except Exception:
         log.exception("Failed to read subcatchments: ./%s", dataUtils.relPath(subcatchGeo, cairosDir))
         return
@@ -282,42 +494,80 @@ def runPraSegmentation(cfg, workFlowDir=None, avaDir=None):
     totalPolysFiltered, totalAreaSqmFiltered = 0, 0
     totalClassCountsFiltered = {k: 0 for k in sizeClasses}
 
+    # --- Reproject subcatchments once per PRA CRS (usually one for all files) ---
+    praCrsKeys = {}
+    subcatchByCrs = {}
     for inPath in praFiles:
-        outPath, nPolys, sumAreaSqm, classCounts = processSinglePraLayer(
-            inPath,
-            subcatchGdf,
-            praSegmentationDir,
-            streamThreshold,
-            minLength,
-            smoothingWindowSize,
-            cairosDir,
-            sizeClasses,
-            demCrs,
-        )
-        if not outPath:
-            continue
-
-        nOk += 1
-        totalPolys += nPolys
-        totalAreaSqm += sumAreaSqm
-        for k in totalClassCounts:
-            totalClassCounts[k] += classCounts[k]
-
-        baseNoExt = os.path.splitext(os.path.basename(inPath))[0]
-        filteredBase = os.path.join(
-            praSegmentationDir,
-            f"{baseNoExt}_subC{streamThreshold}_{minLength}_{smoothingWindowSize}_sizeF{int(sizeFilter)}",
-        )
-
-        kept, outGeo, filteredClasses = applySizeFilter(
-            outPath, sizeFilter, filteredBase, cairosDir, sizeClasses
+        praCrs = dataUtils.readGeoCrs(inPath)
+        crsKey = praCrs.to_wkt() if praCrs is not None else ""
+        praCrsKeys[inPath] = crsKey
+        if crsKey not in subcatchByCrs:
+            reproject = praCrs is not None and subcatchGdf.crs != praCrs
+            subcatchByCrs[crsKey] = subcatchGdf.to_crs(praCrs) if reproject else subcatchGdf
+
+    # Overlay (GEOS) and pyogrio I/O release the GIL, so threads scale without
+    # pickling subcatchments. Processes receive them once through the initializer.
+    log.info(
+        "Step 05: processing %d PRA files with %d %s workers", len(praFiles), nWorkers, poolType
+    )
+    if poolType == "process":
+        executor = ProcessPoolExecutor(
+            max_workers=max(1, nWorkers),
+            initializer=_initSegmentationWorker,
+            initargs=(subcatchByCrs,),
         )
-        totalPolysFiltered += kept
-        if kept > 0:
-            gdfF = gpd.read_file(outGeo)
-            totalAreaSqmFiltered += float(gdfF["area_m"].sum())
-        for k in totalClassCountsFiltered:
-            totalClassCountsFiltered[k] += filteredClasses[k]
+        worker, subcatchArgs = _segmentAndFilterInWorker, praCrsKeys
+    else:
+        # build the spatial indexes once before sharing them between threads
+        for gdf in subcatchByCrs.values():
+            _ = gdf.sindex
+        executor = ThreadPoolExecutor(max_workers=max(1, nWorkers))
+        worker = segmentAndFilterPraLayer
+        subcatchArgs = {inPath: subcatchByCrs[key] for inPath, key in praCrsKeys.items()}
+
+    with executor as ex:
+        futures = [
+            ex.submit(
+                worker,
+                inPath,
+                subcatchArgs[inPath],
+                praSegmentationDir,
+                streamThreshold,
+                minLength,
+                smoothingWindowSize,
+                cairosDir,
+                sizeClasses,
+                demCrs,
+                sizeFilter,
+                vectorDriver,
+                daskPartitions,
+            )
+            for inPath in praFiles
+        ]
+        for fut in as_completed(futures):
+            (
+                outPath,
+                nPolys,
+                sumAreaSqm,
+                classCounts,
+                kept,
+                _outGeo,
+                filteredClasses,
+                sumAreaSqmFiltered,
+            ) = fut.result()
+            if not outPath:
+                continue
+
+            nOk += 1
+            totalPolys += nPolys
+            totalAreaSqm += sumAreaSqm
+            for k in totalClassCounts:
+                totalClassCounts[k] += classCounts[k]
+
+            totalPolysFiltered += kept
+            totalAreaSqmFiltered += sumAreaSqmFiltered
+            for k in totalClassCountsFiltered:
+                totalClassCountsFiltered[k] += filteredClasses[k]
 
     tDt = time.perf_counter() - tAll
 
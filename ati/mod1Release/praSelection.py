@@ -45,12 +45,12 @@
 
 import os
 import glob
+import itertools
 import time
 import logging
 import numpy as np
-import geopandas as gpd
 import rasterio.features
-from typing import cast
+from numba import njit, prange
 
 import ati.mod0Helper.dataUtils as dataUtils
 from ati.mod0Helper.dataUtils import timeIt, relPath
@@ -66,7 +66,7 @@ def readRaster(path):
     return data, profile["transform"], profile["crs"]
 
 
-def writeRaster(path, data, demPath, *, dtype="int16", nodata=-9999):
+def writeRaster(path, data, demPath, *, dtype="uint8", nodata=255):
     """Write raster aligned to DEM grid (CRS/transform match exactly)."""
     dataUtils.saveRaster(demPath, path, data, dtype=dtype, nodata=nodata)
 
@@ -75,13 +75,13 @@ def writeRaster(path, data, demPath, *, dtype="int16", nodata=-9999):
 
 
 def applyPraFilter(praData, praThreshold=0.4):
-    """Binary mask from PRA threshold."""
-    return np.where(praData >= praThreshold, 1, 0)
+    """Boolean mask from PRA threshold."""
+    return praData >= praThreshold
 
 
 def applyDemFilter(demData, minElev=1000, maxElev=4000):
-    """Binary mask for elevation range."""
-    return np.where((demData >= minElev) & (demData <= maxElev), 1, 0)
+    """Boolean mask for elevation range."""
+    return (demData >= minElev) & (demData <= maxElev)
 
 
 def getAspectSector(aspect):
@@ -105,10 +105,54 @@ def getAspectSector(aspect):
     return "Unknown"
 
 
+SECTOR_CODES = {"N": 0, "NE": 1, "E": 2, "SE": 3, "S": 4, "SW": 5, "W": 6, "NW": 7}
+UNKNOWN_SECTOR_CODE = 8
+
+
+def aspectSectorCodes(aspectData):
+    """Vectorized getAspectSector: aspect degrees → uint8 sector code.
+
+    Codes follow SECTOR_CODES; NaN maps to UNKNOWN_SECTOR_CODE. As in
+    getAspectSector, anything below 22.5° or from 337.5° upwards is N.
+    """
+    aspectData = np.asarray(aspectData, dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        codes = np.floor_divide(aspectData + 22.5, 45.0)
+        codes[(aspectData < 22.5) | (aspectData >= 337.5)] = SECTOR_CODES["N"]
+    codes[np.isnan(aspectData)] = UNKNOWN_SECTOR_CODE
+    return codes.astype(np.uint8)
+
+
+def sectorLookup(sectors):
+    """Boolean LUT over sector codes that is True for the allowed sectors."""
+    allowed = np.zeros(UNKNOWN_SECTOR_CODE + 1, dtype=bool)
+    for sector in sectors:
+        allowed[SECTOR_CODES[sector]] = True
+    return allowed
+
+
 def applyAspectFilter(aspectData, sectors=("N", "NE", "E", "SE", "S", "SW", "W", "NW")):
-    """Binary mask for allowed aspect sectors."""
-    aspectSectorMap = np.vectorize(getAspectSector)(aspectData)
-    return np.isin(aspectSectorMap, sectors).astype(int)
+    """Boolean mask for allowed aspect sectors."""
+    return sectorLookup(sectors)[aspectSectorCodes(aspectData)]
+
+
+@njit(parallel=True, cache=True)
+def selectionMaskNumba(praData, demData, sectorCodes, praThreshold, minElev, maxElev, allowed, out):
+    """Fused PRA/elevation/aspect selection: write 1/0 per cell into ``out``.
+
+    Same result as applyPraFilter & applyDemFilter & applyAspectFilter, in a
+    single pass without full-size temporaries. ``sectorCodes`` comes from
+    aspectSectorCodes, ``allowed`` from sectorLookup.
+    """
+    ny, nx = praData.shape
+    for i in prange(ny):
+        for j in range(nx):
+            e = demData[i, j]
+            if praData[i, j] >= praThreshold and e >= minElev and e <= maxElev and allowed[sectorCodes[i, j]]:
+                out[i, j] = 1
+            else:
+                out[i, j] = 0
+    return out
 
 
 # ----------------------------- Sector Groups -----------------------------
@@ -197,28 +241,25 @@ def runPraSelection(cfg, workFlowDir):
                 f"Commission region file not found: {commRegionPath}"
             )
 
-        commGdf = cast(gpd.GeoDataFrame, gpd.read_file(commRegionPath))
+        commGdf = dataUtils.readGeoData(commRegionPath)
         if getattr(commGdf, "crs", None) != demCrs:
             commGdf = commGdf.to_crs(demCrs)
 
         with timeIt("commission region mask"):
-            maskArr = rasterio.features.rasterize(
-                [(geom, 1) for geom in commGdf.geometry],
+            # 1 outside the region, 0 inside; used as a bool view below
+            outsideArr = rasterio.features.rasterize(
+                zip(commGdf.geometry.values, itertools.repeat(0)),
                 out_shape=praData.shape,
                 transform=transform,
-                fill=0,
+                fill=1,
                 dtype="uint8",
             )
-            praData = np.where(maskArr == 1, praData, 0)
+            np.copyto(praData, 0, where=outsideArr.view(np.bool_))
             log.info(
                 "...applied commission region mask (%s)",
                 os.path.basename(commRegionPath),
             )
 
-    # --- Basic filters ---
-    praFiltered = applyPraFilter(praData, praThreshold=praThreshold)
-    demFiltered = applyDemFilter(demData, minElev=minElev, maxElev=maxElev)
-
     # --- Aspect sectors to process ---
     if aspectSector == "all":
         groupsToRun = sectorGroups
@@ -251,16 +292,26 @@ def runPraSelection(cfg, workFlowDir):
     if selCfg.getboolean("noAspectSelection"):
         groupsToRun = [["all"]]
 
+    # thresholds in the raster dtypes, so comparisons match the NumPy filters
+    praThresholdT = praData.dtype.type(praThreshold)
+    minElevT, maxElevT = demData.dtype.type(minElev), demData.dtype.type(maxElev)
+
+    # aspect → sector codes once; each sector is then a 9-entry table lookup
+    sectorCodes = aspectSectorCodes(aspectData)
+    del aspectData
+
     praThreshold100 = f"{int(praThreshold * 100):03d}"
+    finalMask = np.empty(praData.shape, dtype=np.uint8)
     for sectors in groupsToRun:
         with timeIt(f"aspect sector {sectors}"):
             if sectors == ["all"]:
-                finalMask = np.logical_and(praFiltered, demFiltered)
+                # no aspect constraint, not even on aspect nodata
+                allowed = np.ones(UNKNOWN_SECTOR_CODE + 1, dtype=np.bool_)
             else:
-                aspectFiltered = applyAspectFilter(aspectData, sectors=sectors)
-                finalMask = np.logical_and(
-                    np.logical_and(praFiltered, demFiltered), aspectFiltered
-                )
+                allowed = sectorLookup(sectors)
+            selectionMaskNumba(
+                praData, demData, sectorCodes, praThresholdT, minElevT, maxElevT, allowed, finalMask
+            )
 
             sectorKey = frozenset(sectors)
             sectorsStrOut = sectorNames.get(sectorKey, "-".join(sectors))
@@ -268,7 +319,7 @@ def runPraSelection(cfg, workFlowDir):
                 outputDir, f"pra{praThreshold100}{sectorsStrOut}.tif"
             )
 
-            writeRaster(outPath, finalMask.astype(np.int16), demPath)
+            writeRaster(outPath, finalMask, demPath)
             relOutPath = relPath(outPath, cairosDir)
             log.info("...selected PRA written to: ./%s", relOutPath)
 
@@ -11,7 +11,7 @@
 #
 # Outputs :
 #     - subcatchments.tif / subcatchments_smoothed.tif
-#     - subcatchments.shp / subcatchments_smoothed.shp
+#     - subcatchments.shp / subcatchments_smoothed.shp (+ .fgb)
 #       (depending on smoothing and configuration settings)
 #
 # Config :
@@ -20,6 +20,12 @@
 #         • minLength
 #         • smoothingWindowSize
 #         • weightedSlopeFlow
+#         • nWorkers            parallel stream thresholds (processes)
+#         • reuseOutputs        skip hydro prep / parameter sets whose outputs and backends are current
+#         • writeFlatGeobuf     also write smoothed subcatchments as .fgb (read by Step 05)
+#         • smoothingBackend    majority filter: whitebox | numba (tiled, in-process)
+#         • polygonizeBackend   raster → vector: whitebox | rasterio (in-process)
+#         • scratchDir          intermediate grids: empty = output dir, auto = /dev/shm, or a path
 #
 # Consumes :
 #     - DEM raster
@@ -43,26 +49,48 @@
 
 
 import os
+import json
+import hashlib
+import shutil
 import time
 import logging
+import threading
 import warnings
-from typing import cast
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import pathlib
 
+import numpy as np
+import rasterio.features
 import geopandas as gpd
-from shapely.validation import make_valid
-from whitebox.whitebox_tools import WhiteboxTools
+import shapely
+from numba import njit, prange
+
+try:
+    import dask_geopandas as dgpd
+
+    _HAS_DASK_GEOPANDAS = True
+except Exception:
+    _HAS_DASK_GEOPANDAS = False
 
 import avaframe.in1Data.getInput as getInput
 import avaframe.in3Utils.cfgUtils as cfgUtils
 
 import ati
+import ati.mod0Helper.dataUtils as dataUtils
 from ati.mod0Helper.dataUtils import timeIt, relPath
 
 # ------------------ Setup ------------------ #
 
 log = logging.getLogger(__name__)
-wbt = WhiteboxTools()
+try:
+    from whitebox.whitebox_tools import WhiteboxTools
+
+    # fetches the Whitebox binary on first use → the in-process helpers stay importable without it
+    wbt = WhiteboxTools()
+    _HAS_WHITEBOX = True
+except Exception:
+    wbt = None
+    _HAS_WHITEBOX = False
 
 logging.getLogger("pyogrio").setLevel(logging.ERROR)
 warnings.filterwarnings("ignore", category=RuntimeWarning, module=r"pyogrio\..*")
@@ -83,18 +111,110 @@ def parseIntList(val):
     return [int(val)]
 
 
-def fixInvalidGeometries(shpPath: str) -> None:
-    """Fix invalid geometries in-place for a Shapefile."""
-    log.debug("Fixing invalid geometries: %s", os.path.basename(shpPath))
-    gdf = cast(gpd.GeoDataFrame, gpd.read_file(shpPath))
-    gdf["geometry"] = gdf.geometry.apply(make_valid)
-    gdf.to_file(shpPath)  # type: ignore[attr-defined]
+# repairs above this many geometries are spread over dask-geopandas partitions
+DASK_MAKE_VALID_MIN = 10_000
+
+
+def makeValidPartitioned(geoms, crs, nPartitions=None):
+    """shapely.make_valid over dask-geopandas partitions (multi-core GEOS)."""
+    nPartitions = nPartitions or os.cpu_count() or 1
+    ds = dgpd.from_geopandas(gpd.GeoSeries(geoms, crs=crs), npartitions=nPartitions)
+    fixed = ds.map_partitions(lambda part: part.make_valid(), meta=ds._meta).compute()
+    return fixed.to_numpy()
+
+
+def fixInvalidGeometries(shpPath: str, fgbPath: str | None = None) -> None:
+    """Fix invalid geometries in-place for a Shapefile (no rewrite if all are valid).
+
+    With ``fgbPath`` the (fixed) polygons are also written as FlatGeobuf, which
+    Step 05 reads instead of converting the shapefile itself. Otherwise only
+    the geometries are read for the validity check, and the attributes only
+    if something needs fixing.
+    """
+    gdf = dataUtils.readGeoData(shpPath, columns=None if fgbPath else [])
+    geoms = gdf.geometry.values.to_numpy()
+    invalid = ~shapely.is_valid(geoms)
+    if invalid.any():
+        if fgbPath is None:
+            gdf = dataUtils.readGeoData(shpPath)
+        nInvalid = int(invalid.sum())
+        log.debug("Fixing %d invalid geometries: %s", nInvalid, os.path.basename(shpPath))
+        if _HAS_DASK_GEOPANDAS and nInvalid > DASK_MAKE_VALID_MIN:
+            geoms[invalid] = makeValidPartitioned(geoms[invalid], gdf.crs)
+        else:
+            geoms[invalid] = shapely.make_valid(geoms[invalid])
+        gdf["geometry"] = gpd.GeoSeries(geoms, index=gdf.index, crs=gdf.crs)
+        dataUtils.writeGeoData(gdf, shpPath, driver="ESRI Shapefile")
+    if fgbPath is not None:
+        dataUtils.writeGeoData(gdf, fgbPath, driver="FlatGeobuf")
+
+
+def polygonizeRaster(tifPath, shpPath, fgbPath=None):
+    """In-process raster → polygons (rasterio.features.shapes), fixed and written once.
+
+    Like RasterToVectorPolygons, each connected patch of equal non-zero,
+    non-nodata cells becomes one polygon with FID/VALUE attributes.
+    """
+    labels, profile = dataUtils.readRaster(tifPath, return_profile=True)
+    mask = labels != 0
+    if profile["nodata"] is not None:
+        mask &= labels != profile["nodata"]
+    shapes = list(rasterio.features.shapes(labels, mask=mask, transform=profile["transform"]))
+    # one GEOS parse for all rings instead of one shape() call per polygon
+    collection = {"type": "GeometryCollection", "geometries": [geom for geom, _ in shapes]}
+    geoms = shapely.get_parts(shapely.from_geojson(json.dumps(collection)))
+    invalid = ~shapely.is_valid(geoms)
+    if invalid.any():
+        geoms[invalid] = shapely.make_valid(geoms[invalid])
+    gdf = gpd.GeoDataFrame(
+        {
+            "FID": np.arange(len(shapes), dtype=np.int64),
+            "VALUE": np.array([value for _, value in shapes], dtype=labels.dtype),
+        },
+        geometry=geoms,
+        crs=profile["crs"],
+    )
+    dataUtils.writeGeoData(gdf, shpPath, driver="ESRI Shapefile")
+    if fgbPath is not None:
+        dataUtils.writeGeoData(gdf, fgbPath, driver="FlatGeobuf")
+    return pathlib.Path(shpPath)
+
+
+def vectorizeSubcatchments(label, tifPath, shpPath, fgbPath=None, polygonizeBackend="whitebox"):
+    """Polygonize a subcatchment raster into a valid shapefile (+ optional .fgb)."""
+    if polygonizeBackend == "rasterio":
+        return polygonizeRaster(tifPath, shpPath, fgbPath)
+    runWhiteboxTool(
+        f"RasterToVectorPolygons ({label})", shpPath, wbt.raster_to_vector_polygons, tifPath, shpPath
+    )
+    fixInvalidGeometries(shpPath, fgbPath)
+    return pathlib.Path(shpPath)
+
+
+SHAPEFILE_SIDECARS = (".shp", ".shx", ".dbf", ".prj", ".cpg")
+
+
+def copyShapefile(srcShp, dstShp):
+    """Copy a shapefile with its sidecar files to a new base name."""
+    srcBase, dstBase = os.path.splitext(srcShp)[0], os.path.splitext(dstShp)[0]
+    for ext in SHAPEFILE_SIDECARS:
+        if os.path.exists(srcBase + ext):
+            shutil.copyfile(srcBase + ext, dstBase + ext)
+
+
+# The Whitebox wrapper chdirs into its binary directory for every call and back
+# afterwards; the working directory is process-wide, so calls from threads are
+# serialized (in-process work of other threads still overlaps with them).
+_wbtLock = threading.Lock()
 
 
 def runWhiteboxTool(label, outputPath, tool, *args):
     """Run a Whitebox tool and fail at the operation that did not create its output."""
+    if not _HAS_WHITEBOX:
+        raise RuntimeError("Step 03 needs WhiteboxTools (whitebox package and its binary)")
     messages = []
-    returnCode = tool(*args, callback=messages.append)
+    with _wbtLock:
+        returnCode = tool(*args, callback=messages.append)
     outputPath = pathlib.Path(outputPath)
     if returnCode != 0 or not outputPath.exists():
         details = "\n".join(str(message) for message in messages[-10:]).strip()
@@ -108,15 +228,87 @@ def runWhiteboxTool(label, outputPath, tool, *args):
     return outputPath
 
 
+def configureWhitebox(maxProcs):
+    """Enable compressed Whitebox rasters and set its core count, once per Step 03 run.
+
+    Both setters run the Whitebox binary and persist into its settings.json, so they
+    are not called at import time. Worker processes forked afterwards inherit the
+    compression flag of the module-level ``wbt``.
+    """
+    messages = []
+    with _wbtLock:
+        # the setters report through default_callback (print) → collect instead
+        prevCallback = wbt.default_callback
+        wbt.set_default_callback(messages.append)
+        try:
+            # intermediate grids (filled DEM, flow grids, streams, subcatchments) are
+            # read back by the next tool; compressed GeoTIFFs cut disk and read volume
+            wbt.set_compress_rasters(True)
+            wbt.set_max_procs(maxProcs)
+        finally:
+            wbt.set_default_callback(prevCallback)
+    log.debug("WhiteboxTools settings: %s", " ".join(str(m) for m in messages).strip())
+
+
+# ------------------ Output Reuse ------------------ #
+
+HYDRO_CACHE_NAME = ".hydro_cache.json"
+
+
+def hydroCacheKey(demPath, weightedSlopeFlow):
+    """Key identifying the DEM state and flow weighting the hydro grids were built from."""
+    st = os.stat(demPath)
+    return {
+        "dem": os.path.abspath(str(demPath)),
+        "mtime": st.st_mtime,
+        "size": st.st_size,
+        "weightedSlopeFlow": bool(weightedSlopeFlow),
+    }
+
+
+def readCacheKey(cachePath):
+    """Settings recorded next to reused outputs (None if missing or unreadable)."""
+    try:
+        with open(cachePath) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def writeCacheKey(cachePath, cacheKey):
+    """Record the settings the outputs next to ``cachePath`` were built with."""
+    with open(cachePath, "w") as f:
+        json.dump(cacheKey, f)
+
+
 # ------------------ Hydro Prep ------------------ #
 
 
-def prepHydroGrids(demPath, outDir, weightedSlopeFlow=False):
-    """Fill DEM, derive flow direction/accumulation, and slope."""
+def prepHydroGrids(demPath, outDir, weightedSlopeFlow=False, reuseOutputs=True):
+    """Fill DEM, derive flow direction/accumulation, and slope.
+
+    With ``reuseOutputs`` the Whitebox calls are skipped when the grids from a
+    previous run exist, are newer than the DEM and were built with the same
+    DEM (path, mtime, size) and weighting, as recorded in .hydro_cache.json.
+    """
     filledDem = buildPath(outDir, "filled_DEM.tif")
     flowDir = buildPath(outDir, "flow_direction.tif")
     flowAcc = buildPath(outDir, "flow_accumulation.tif")
     slopeTif = buildPath(outDir, "slope.tif")
+    weightedFlow = buildPath(outDir, "weighted_flow.tif")
+    cachePath = buildPath(outDir, HYDRO_CACHE_NAME)
+
+    if weightedSlopeFlow:
+        result = (filledDem, flowDir, weightedFlow, "_weighted")
+    else:
+        result = (filledDem, flowDir, flowAcc, "_unweighted")
+
+    cacheKey = hydroCacheKey(demPath, weightedSlopeFlow)
+    outputs = [filledDem, flowDir, flowAcc, slopeTif] + ([weightedFlow] if weightedSlopeFlow else [])
+    if reuseOutputs and os.path.exists(cachePath) and dataUtils.outputsUpToDate(outputs, [demPath]):
+        if readCacheKey(cachePath) == cacheKey:
+            log.info("...reusing hydro grids (DEM unchanged since last run)")
+            return result
 
     with timeIt("Hydro prep (fill/d8/fac/slope)"):
         runWhiteboxTool("FillDepressions", filledDem, wbt.fill_depressions, demPath, filledDem)
@@ -126,17 +318,148 @@ def prepHydroGrids(demPath, outDir, weightedSlopeFlow=False):
 
     if weightedSlopeFlow:
         log.debug("Using slope-weighted flow accumulation")
-        weightedFlow = buildPath(outDir, "weighted_flow.tif")
         runWhiteboxTool("Multiply", weightedFlow, wbt.multiply, flowAcc, slopeTif, weightedFlow)
-        return filledDem, flowDir, weightedFlow, "_weighted"
-
-    log.debug("Using unweighted flow accumulation")
-    return filledDem, flowDir, flowAcc, "_unweighted"
+    else:
+        log.debug("Using unweighted flow accumulation")
+
+    writeCacheKey(cachePath, cacheKey)
+    return result
+
+
+# ------------------ Smoothing ------------------ #
+
+# Whitebox is called as majority_filter(i, output, filterx) → filtery keeps its default of 11
+MAJORITY_FILTER_Y = 11
+MAJORITY_TILE = 512
+
+
+@njit(parallel=True, cache=True)
+def majorityFilterNumba(labels, nodata, sizeY, sizeX, tile, out):
+    """Moving-window majority (mode) of a label raster, processed in tile×tile blocks.
+
+    Nodata cells stay nodata and are not counted; the window is clipped at the
+    raster edge. Ties keep the centre label if it is among the most frequent,
+    otherwise the smallest label wins. Each block only touches its own rows
+    plus a halo of half a window, which keeps the working set cache resident.
+    """
+    ny, nx = labels.shape
+    ry, rx = sizeY // 2, sizeX // 2
+    nTy = (ny + tile - 1) // tile
+    nTx = (nx + tile - 1) // tile
+    nMax = sizeY * sizeX
+    for t in prange(nTy * nTx):
+        i0 = (t // nTx) * tile
+        j0 = (t % nTx) * tile
+        vals = np.empty(nMax, dtype=labels.dtype)
+        counts = np.empty(nMax, dtype=np.int64)
+        for i in range(i0, min(i0 + tile, ny)):
+            for j in range(j0, min(j0 + tile, nx)):
+                c = labels[i, j]
+                if c == nodata:
+                    out[i, j] = nodata
+                    continue
+                n = 0
+                for ii in range(max(0, i - ry), min(ny, i + ry + 1)):
+                    for jj in range(max(0, j - rx), min(nx, j + rx + 1)):
+                        v = labels[ii, jj]
+                        if v == nodata:
+                            continue
+                        k = 0
+                        while k < n and vals[k] != v:
+                            k += 1
+                        if k == n:
+                            vals[n] = v
+                            counts[n] = 1
+                            n += 1
+                        else:
+                            counts[k] += 1
+                best = c
+                bestCount = 0
+                for k in range(n):
+                    if vals[k] == c:
+                        bestCount = counts[k]
+                for k in range(n):
+                    if counts[k] > bestCount or (counts[k] == bestCount and best != c and vals[k] < best):
+                        best = vals[k]
+                        bestCount = counts[k]
+                out[i, j] = best
+    return out
+
+
+def majorityFilterRaster(inTif, outTif, windowSize):
+    """In-process counterpart of wbt.majority_filter(inTif, outTif, windowSize)."""
+    labels, profile = dataUtils.readRaster(inTif, return_profile=True)
+    nodata = profile["nodata"]
+    nodata = labels.dtype.type(nodata if nodata is not None else 0)
+    out = np.empty_like(labels)
+    majorityFilterNumba(labels, nodata, MAJORITY_FILTER_Y, int(windowSize), MAJORITY_TILE, out)
+    dataUtils.saveRaster(inTif, outTif, out, dtype=labels.dtype, nodata=nodata, compress="deflate")
+    return pathlib.Path(outTif)
 
 
 # ------------------ Parameter Run ------------------ #
 
 
+def extractStreamNetwork(flowDir, flowAccToUse, outDir, streamThreshold, reuseOutputs=True):
+    """Extract streams and stream links for one threshold; returns the junctions raster.
+
+    Both only depend on the threshold, not on minLength or smoothingWindowSize.
+    """
+    streamsTif = buildPath(outDir, f"streams_{streamThreshold}.tif")
+    junctionsTif = buildPath(outDir, f"junctions_{streamThreshold}.tif")
+    if reuseOutputs and dataUtils.outputsUpToDate([streamsTif, junctionsTif], [flowDir, flowAccToUse]):
+        return junctionsTif
+
+    with timeIt("Extract streams"):
+        runWhiteboxTool(
+            "ExtractStreams", streamsTif, wbt.extract_streams, flowAccToUse, streamsTif, streamThreshold
+        )
+    with timeIt("Stream links"):
+        runWhiteboxTool(
+            "StreamLinkIdentifier",
+            junctionsTif,
+            wbt.stream_link_identifier,
+            flowDir,
+            streamsTif,
+            junctionsTif,
+        )
+    return junctionsTif
+
+
+def delineateWatersheds(
+    flowDir,
+    junctionsTif,
+    outDir,
+    streamThreshold,
+    flowSuffix,
+    reuseOutputs=True,
+    polygonizeBackend="whitebox",
+):
+    """Watershed raster and its (fixed) polygons for one threshold.
+
+    Like the stream network they only depend on the threshold (and the
+    polygonize backend, recorded in a .json next to them); each parameter set
+    copies them to its own subcatchment outputs. Returns (tif, shp).
+    """
+    watershedTif = buildPath(outDir, f"watersheds_{streamThreshold}{flowSuffix}.tif")
+    watershedShp = buildPath(outDir, f"watersheds_{streamThreshold}{flowSuffix}.shp")
+    cachePath = buildPath(outDir, f".watersheds_{streamThreshold}{flowSuffix}.json")
+    cacheKey = {"polygonizeBackend": polygonizeBackend}
+    if (
+        reuseOutputs
+        and dataUtils.outputsUpToDate([watershedTif, watershedShp], [flowDir, junctionsTif])
+        and readCacheKey(cachePath) == cacheKey
+    ):
+        return watershedTif, watershedShp
+
+    with timeIt("Watershed delineation"):
+        runWhiteboxTool("Watershed", watershedTif, wbt.watershed, flowDir, junctionsTif, watershedTif)
+    with timeIt("Raster→Vector (raw)"):
+        vectorizeSubcatchments("raw", watershedTif, watershedShp, polygonizeBackend=polygonizeBackend)
+    writeCacheKey(cachePath, cacheKey)
+    return watershedTif, watershedShp
+
+
 def runParamSet(
     flowDir,
     flowAccToUse,
@@ -145,8 +468,24 @@ def runParamSet(
     minLength,
     smoothingWindowSize,
     flowSuffix,
+    reuseOutputs=True,
+    writeFlatGeobuf=True,
+    smoothingBackend="whitebox",
+    polygonizeBackend="whitebox",
+    junctionsTif=None,
+    watershedOutputs=None,
 ):
-    """Run subcatchment delineation and export shapefiles."""
+    """Run subcatchment delineation and export shapefiles.
+
+    With ``reuseOutputs`` a parameter set whose rasters and shapefiles are all
+    newer than the flow grids and were built with the same backends is skipped.
+    With ``writeFlatGeobuf`` the smoothed subcatchments are also written as .fgb
+    next to the shapefile.
+    ``smoothingBackend`` selects the majority filter (whitebox | numba),
+    ``polygonizeBackend`` the raster → vector step (whitebox | rasterio).
+    ``junctionsTif`` from extractStreamNetwork and ``watershedOutputs`` from
+    delineateWatersheds are reused if given.
+    """
     log.info(
         "...streamThr=%s, minLen=%s, smooth=%s, weightedFlow=%s",
         streamThreshold,
@@ -156,94 +495,148 @@ def runParamSet(
     )
 
     # Output paths
-    subcatchTif = buildPath(
-        outDir,
-        f"subcatchments_{streamThreshold}_{minLength}_{smoothingWindowSize}{flowSuffix}.tif",
-    )
-    subcatchShp = buildPath(
-        outDir,
-        f"subcatchments_{streamThreshold}_{minLength}_{smoothingWindowSize}{flowSuffix}.shp",
-    )
-    smoothSubcatchTif = buildPath(
-        outDir,
-        f"smooth_subcatchments_{streamThreshold}_{minLength}_{smoothingWindowSize}{flowSuffix}.tif",
-    )
-    smoothSubcatchShp = buildPath(
-        outDir,
-        f"subcatchments_smoothed_{streamThreshold}_{minLength}_{smoothingWindowSize}{flowSuffix}.shp",
-    )
-    nonSmoothSubcatchShp = buildPath(
-        outDir,
-        f"subcatchments_non_smoothed_{streamThreshold}_{minLength}_{smoothingWindowSize}{flowSuffix}.shp",
-    )
-
-    # 1) Extract streams
-    streamsTif = buildPath(outDir, f"streams_{streamThreshold}.tif")
-    with timeIt("Extract streams"):
-        runWhiteboxTool(
-            "ExtractStreams", streamsTif, wbt.extract_streams, flowAccToUse, streamsTif, streamThreshold
+    tag = f"{streamThreshold}_{minLength}_{smoothingWindowSize}{flowSuffix}"
+    subcatchTif = buildPath(outDir, f"subcatchments_{tag}.tif")
+    subcatchShp = buildPath(outDir, f"subcatchments_{tag}.shp")
+    smoothSubcatchTif = buildPath(outDir, f"smooth_subcatchments_{tag}.tif")
+    smoothSubcatchShp = buildPath(outDir, f"subcatchments_smoothed_{tag}.shp")
+    nonSmoothSubcatchShp = buildPath(outDir, f"subcatchments_non_smoothed_{tag}.shp")
+    cachePath = buildPath(outDir, f".subcatchments_{tag}.json")
+    cacheKey = {"smoothingBackend": smoothingBackend, "polygonizeBackend": polygonizeBackend}
+
+    if (
+        reuseOutputs
+        and dataUtils.outputsUpToDate(
+            [subcatchTif, smoothSubcatchTif, subcatchShp, smoothSubcatchShp, nonSmoothSubcatchShp],
+            [flowDir, flowAccToUse],
         )
-
-    # 2) Flow-based watershed delineation
-    junctionsTif = buildPath(outDir, f"junctions_{streamThreshold}.tif")
-    with timeIt("Watershed delineation"):
-        runWhiteboxTool(
-            "StreamLinkIdentifier",
-            junctionsTif,
-            wbt.stream_link_identifier,
-            flowDir,
-            streamsTif,
-            junctionsTif,
+        and readCacheKey(cachePath) == cacheKey
+    ):
+        log.info("...outputs up to date, skipping")
+        return
+
+    # 1) Streams, junctions and watersheds (shared by all sets of this threshold)
+    if watershedOutputs is None:
+        if junctionsTif is None:
+            junctionsTif = extractStreamNetwork(flowDir, flowAccToUse, outDir, streamThreshold, reuseOutputs)
+        watershedOutputs = delineateWatersheds(
+            flowDir, junctionsTif, outDir, streamThreshold, flowSuffix, reuseOutputs, polygonizeBackend
         )
-        runWhiteboxTool("Watershed", subcatchTif, wbt.watershed, flowDir, junctionsTif, subcatchTif)
+    watershedTif, watershedShp = watershedOutputs
 
-    # 3) Raster→Vector (raw)
-    with timeIt("Raster→Vector (raw)"):
-        runWhiteboxTool(
-            "RasterToVectorPolygons (raw)",
-            subcatchShp,
-            wbt.raster_to_vector_polygons,
-            subcatchTif,
-            subcatchShp,
-        )
-        fixInvalidGeometries(subcatchShp)
+    # 2) Subcatchment raster and raw vector of this set
+    shutil.copyfile(watershedTif, subcatchTif)
+    copyShapefile(watershedShp, subcatchShp)
 
-    # 4) Smooth + Vectorize
+    # 3) Smooth + Vectorize
     with timeIt("Smooth + Vectorize"):
-        runWhiteboxTool(
-            "MajorityFilter",
-            smoothSubcatchTif,
-            wbt.majority_filter,
-            subcatchTif,
-            smoothSubcatchTif,
-            smoothingWindowSize,
+        if smoothingBackend == "numba":
+            majorityFilterRaster(subcatchTif, smoothSubcatchTif, smoothingWindowSize)
+        else:
+            runWhiteboxTool(
+                "MajorityFilter",
+                smoothSubcatchTif,
+                wbt.majority_filter,
+                subcatchTif,
+                smoothSubcatchTif,
+                smoothingWindowSize,
+            )
+        smoothSubcatchFgb = os.path.splitext(smoothSubcatchShp)[0] + ".fgb" if writeFlatGeobuf else None
+        vectorizeSubcatchments(
+            "smoothed", smoothSubcatchTif, smoothSubcatchShp, smoothSubcatchFgb, polygonizeBackend
         )
-        runWhiteboxTool(
-            "RasterToVectorPolygons (smoothed)",
-            smoothSubcatchShp,
-            wbt.raster_to_vector_polygons,
-            smoothSubcatchTif,
-            smoothSubcatchShp,
-        )
-        fixInvalidGeometries(smoothSubcatchShp)
 
-    # 5) Non-smoothed vector
+    # 4) Non-smoothed vector: same polygons as the raw vector in 2)
     with timeIt("Non-smoothed vector"):
-        runWhiteboxTool(
-            "RasterToVectorPolygons (non-smoothed)",
-            nonSmoothSubcatchShp,
-            wbt.raster_to_vector_polygons,
-            subcatchTif,
-            nonSmoothSubcatchShp,
-        )
-        fixInvalidGeometries(nonSmoothSubcatchShp)
+        copyShapefile(subcatchShp, nonSmoothSubcatchShp)
+    writeCacheKey(cachePath, cacheKey)
 
     log.info("Saved subcatchments: %s", os.path.basename(smoothSubcatchShp))
 
 
+def runThresholdGroup(
+    flowDir,
+    flowAccToUse,
+    outDir,
+    streamThreshold,
+    minLengthList,
+    smoothingWindowSizeList,
+    flowSuffix,
+    reuseOutputs=True,
+    writeFlatGeobuf=True,
+    smoothingBackend="whitebox",
+    polygonizeBackend="whitebox",
+    scratchDir=None,
+):
+    """Run all (minLength, smoothingWindowSize) sets of one stream threshold.
+
+    They share the per-threshold streams/junctions/watershed outputs, which are
+    built once up front (in ``scratchDir``, default ``outDir``). After that the
+    sets only write their own files; two run at a time so one set's Whitebox
+    majority filter overlaps with another's in-process vectorization (Whitebox
+    calls themselves stay serialized, see runWhiteboxTool).
+    Different thresholds are independent.
+    """
+    scratchDir = scratchDir or outDir
+    junctionsTif = extractStreamNetwork(flowDir, flowAccToUse, scratchDir, streamThreshold, reuseOutputs)
+    watershedOutputs = delineateWatersheds(
+        flowDir, junctionsTif, scratchDir, streamThreshold, flowSuffix, reuseOutputs, polygonizeBackend
+    )
+    paramArgs = [
+        (
+            flowDir,
+            flowAccToUse,
+            outDir,
+            streamThreshold,
+            ml,
+            sw,
+            flowSuffix,
+            reuseOutputs,
+            writeFlatGeobuf,
+            smoothingBackend,
+            polygonizeBackend,
+            junctionsTif,
+            watershedOutputs,
+        )
+        for ml in minLengthList
+        for sw in smoothingWindowSizeList
+    ]
+    # the numba majority filter already uses all cores (and its kernels must not be
+    # launched concurrently from several threads), so it keeps the sets sequential
+    nOverlap = 2 if smoothingBackend == "whitebox" else 1
+    if nOverlap == 1 or len(paramArgs) == 1:
+        for args in paramArgs:
+            runParamSet(*args)
+        return
+    with ThreadPoolExecutor(max_workers=nOverlap) as ex:
+        futures = [ex.submit(runParamSet, *args) for args in paramArgs]
+        for fut in as_completed(futures):
+            fut.result()
+
+
 # ------------------ Main ------------------ #
 
 
+def resolveScratchDir(setting, outputDir):
+    """Directory for intermediate grids: outputDir, a tmpfs (``auto``) or a given path.
+
+    A per-output-directory subfolder is used so several projects can share the
+    same scratch location; it is kept so the next run can reuse its grids.
+    """
+    setting = (setting or "").strip()
+    if not setting:
+        return outputDir
+    if setting.lower() == "auto":
+        if not os.path.isdir("/dev/shm"):
+            log.info("...no /dev/shm available; keeping intermediates in the output directory")
+            return outputDir
+        setting = "/dev/shm"
+    tag = hashlib.md5(str(outputDir).encode()).hexdigest()[:8]
+    scratchDir = pathlib.Path(setting) / f"praSubcatchments_{tag}"
+    os.makedirs(scratchDir, exist_ok=True)
+    return scratchDir
+
+
 def runSubcatchments(cfg, workFlowDir=None, avaDir=None):
     """Step 03: Subcatchment delineation."""
     tAll = time.perf_counter()
@@ -278,6 +671,20 @@ def runSubcatchments(cfg, workFlowDir=None, avaDir=None):
     minLengthList = parseIntList(subcCfg.get("minLength", "200"))
     smoothingWindowSizeList = parseIntList(subcCfg.get("smoothingWindowSize", "5"))
     weightedSlopeFlow = subcCfg.getboolean("weightedSlopeFlow", fallback=False)
+    nWorkers = subcCfg.getint("nWorkers", fallback=os.cpu_count() or 1)
+    nWorkers = max(1, min(nWorkers, len(streamThresholdList)))
+    reuseOutputs = subcCfg.getboolean("reuseOutputs", fallback=True)
+    writeFlatGeobuf = subcCfg.getboolean("writeFlatGeobuf", fallback=True)
+    smoothingBackend = subcCfg.get("smoothingBackend", fallback="whitebox").strip().lower()
+    if smoothingBackend not in ("whitebox", "numba"):
+        raise ValueError(f"Invalid smoothingBackend '{smoothingBackend}'. Valid: whitebox, numba")
+    polygonizeBackend = subcCfg.get("polygonizeBackend", fallback="whitebox").strip().lower()
+    if polygonizeBackend not in ("rasterio", "whitebox"):
+        raise ValueError(f"Invalid polygonizeBackend '{polygonizeBackend}'. Valid: rasterio, whitebox")
+    scratchDir = resolveScratchDir(subcCfg.get("scratchDir", fallback=""), outputDir)
+    # Whitebox calls are serialized per process (_wbtLock) → share the cores among the
+    # threshold workers instead of letting every tool use all of them
+    configureWhitebox(max(1, (os.cpu_count() or 1) // nWorkers))
 
     log.info(
         "Step 03: Subcatchments using DEM=./%s, streamThr=%s, minLen=%s, smooth=%s, weightedFlow=%s",
@@ -287,15 +694,41 @@ def runSubcatchments(cfg, workFlowDir=None, avaDir=None):
         ",".join(map(str, smoothingWindowSizeList)),
         weightedSlopeFlow,
     )
+    if scratchDir != outputDir:
+        log.info("...intermediate grids in %s", scratchDir)
 
     _, flowDir, flowAccToUse, flowSuffix = prepHydroGrids(
-        demPath.resolve(), outputDir, weightedSlopeFlow=weightedSlopeFlow
+        demPath.resolve(), scratchDir, weightedSlopeFlow=weightedSlopeFlow, reuseOutputs=reuseOutputs
     )
 
-    for thr in streamThresholdList:
-        for ml in minLengthList:
-            for sw in smoothingWindowSizeList:
-                runParamSet(flowDir, flowAccToUse, outputDir, thr, ml, sw, flowSuffix)
+    groupArgs = [
+        (
+            flowDir,
+            flowAccToUse,
+            outputDir,
+            thr,
+            minLengthList,
+            smoothingWindowSizeList,
+            flowSuffix,
+            reuseOutputs,
+            writeFlatGeobuf,
+            smoothingBackend,
+            polygonizeBackend,
+            scratchDir,
+        )
+        for thr in streamThresholdList
+    ]
+    if nWorkers == 1:
+        for args in groupArgs:
+            runThresholdGroup(*args)
+    else:
+        # Whitebox runs as a subprocess per tool; each worker process uses its own
+        # module-level WhiteboxTools instance.
+        log.info("Step 03: running %d stream thresholds on %d workers", len(groupArgs), nWorkers)
+        with ProcessPoolExecutor(max_workers=nWorkers) as ex:
+            futures = [ex.submit(runThresholdGroup, *args) for args in groupArgs]
+            for fut in as_completed(futures):
+                fut.result()
 
     log.info("Step 03: Subcatchments complete in %.2fs", time.perf_counter() - tAll)
 
@@ -0,0 +1,61 @@
+import numpy as np
+
+from ati.mod1Release.praSelection import (
+    SECTOR_CODES,
+    UNKNOWN_SECTOR_CODE,
+    applyAspectFilter,
+    applyDemFilter,
+    applyPraFilter,
+    aspectSectorCodes,
+    getAspectSector,
+    sectorLookup,
+    selectionMaskNumba,
+)
+
+
+def test_aspect_sector_codes_match_scalar_classification():
+    aspect = np.concatenate(
+        [
+            np.linspace(0.0, 360.0, 1441),
+            [22.5, 67.5, 337.5, 359.999, 360.0, 400.0, -1.0, -9999.0, np.nan],
+        ]
+    ).astype(np.float32)
+
+    codes = aspectSectorCodes(aspect)
+    expected = [SECTOR_CODES.get(getAspectSector(a), UNKNOWN_SECTOR_CODE) for a in aspect]
+
+    np.testing.assert_array_equal(codes, expected)
+
+
+def test_apply_aspect_filter_keeps_only_selected_sectors():
+    aspect = np.array([[0.0, 45.0, 90.0], [180.0, 315.0, np.nan]])
+
+    mask = applyAspectFilter(aspect, sectors=["N", "NE", "NW"])
+
+    np.testing.assert_array_equal(mask, [[1, 1, 0], [0, 1, 0]])
+
+
+def test_fused_selection_kernel_matches_numpy_filters():
+    rng = np.random.default_rng(0)
+    pra = rng.uniform(0.0, 1.0, (60, 80)).astype(np.float32)
+    dem = rng.uniform(500.0, 3000.0, (60, 80)).astype(np.float32)
+    aspect = rng.uniform(-5.0, 365.0, (60, 80)).astype(np.float32)
+    aspect[0, :5] = np.nan
+    sectors = ["S", "SE", "SW"]
+
+    out = np.empty(pra.shape, dtype=np.uint8)
+    selectionMaskNumba(
+        pra,
+        dem,
+        aspectSectorCodes(aspect),
+        np.float32(0.3),
+        np.float32(1000),
+        np.float32(2500),
+        sectorLookup(sectors),
+        out,
+    )
+
+    expected = (
+        applyPraFilter(pra, 0.3) & applyDemFilter(dem, 1000, 2500) & applyAspectFilter(aspect, sectors)
+    )
+    np.testing.assert_array_equal(out, expected)
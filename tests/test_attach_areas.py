@@ -0,0 +1,33 @@
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import box
+
+from ati.mod0Helper import dataUtils
+
+
+def _boxes(crs="EPSG:31287"):
+    return gpd.GeoDataFrame(geometry=[box(0, 0, 100, 50), box(10, 10, 310, 60)], crs=crs)
+
+
+def test_attach_areas_same_crs_keeps_geometry():
+    gdf = _boxes()
+    geometry = gdf.geometry.copy()
+
+    out = dataUtils.attachAreasMetersNoGeomChange(gdf, gdf.crs)
+
+    np.testing.assert_allclose(out["area_m"], [5000.0, 15000.0])
+    np.testing.assert_allclose(out["area_km"], [0.005, 0.015])
+    assert out is gdf
+    assert out.crs == gdf.crs
+    assert out.geometry.equals(geometry)
+
+
+def test_attach_areas_reprojects_only_for_measurement():
+    projected = _boxes()
+    geographic = projected.to_crs("EPSG:4326")
+
+    out = dataUtils.attachAreasMetersNoGeomChange(geographic, projected.crs)
+
+    np.testing.assert_allclose(out["area_m"], [5000.0, 15000.0], rtol=1e-6)
+    assert out.crs == geographic.crs
+    assert out.geometry.equals(geographic.geometry)
@@ -0,0 +1,36 @@
+import os
+
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+from ati.mod1Release import praSubCatchments
+
+
+@pytest.mark.skipif(not praSubCatchments._HAS_WHITEBOX, reason="WhiteboxTools unavailable")
+def test_whitebox_tools_run_after_configure(tmp_path):
+    demPath, slopePath = str(tmp_path / "dem.tif"), str(tmp_path / "slope.tif")
+    dem = np.add.outer(np.arange(8.0), np.arange(8.0)).astype("float32") * 10
+    with rasterio.open(
+        demPath,
+        "w",
+        driver="GTiff",
+        height=8,
+        width=8,
+        count=1,
+        dtype="float32",
+        crs="EPSG:31287",
+        transform=from_origin(0, 80, 10, 10),
+        nodata=-9999,
+    ) as dst:
+        dst.write(dem, 1)
+
+    wbt = praSubCatchments.wbt
+    prevCallback = wbt.default_callback
+    praSubCatchments.configureWhitebox(os.cpu_count() or 1)
+
+    assert wbt.default_callback is prevCallback
+    # no explicit callback → the restored default callback handles the tool output
+    assert wbt.slope(demPath, slopePath) == 0
+    assert os.path.isfile(slopePath)
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from scipy.ndimage import convolve
+
+from ati.mod1Release.praProcessing import cleanMaskPacked
+
+
+def _cleanMaskReference(mask, p1_min, p2_min):
+    edgeKernel1 = np.array([[0, 1, 0], [1, 0, 1], [0, 1, 0]], dtype=np.uint8)
+    edgeKernel2 = np.array([[1, 0, 1], [0, 0, 0], [1, 0, 1]], dtype=np.uint8)
+    mask = (mask > 0).astype(np.uint8)
+    mask1 = mask.copy()
+    mask1[convolve(mask, edgeKernel1, mode="constant", cval=0) < p1_min] = 0
+    mask2 = mask1.copy()
+    mask2[convolve(mask1, edgeKernel2, mode="constant", cval=0) < p2_min] = 0
+    return mask1, mask2
+
+
+@pytest.mark.parametrize("shape", [(1, 1), (7, 13), (40, 64), (33, 101)])
+@pytest.mark.parametrize("p1_min,p2_min", [(0, 0), (1, 1), (2, 3), (3, 2), (4, 4), (5, 1)])
+def test_packed_cleaning_matches_convolution(shape, p1_min, p2_min):
+    rng = np.random.default_rng(42)
+    arr = (rng.random(shape) < 0.6).astype(np.int16)
+
+    mask1, mask2 = cleanMaskPacked(arr, p1_min, p2_min)
+    ref1, ref2 = _cleanMaskReference(arr, p1_min, p2_min)
+
+    assert mask1.dtype == np.uint8
+    np.testing.assert_array_equal(mask1, ref1)
+    np.testing.assert_array_equal(mask2, ref2)
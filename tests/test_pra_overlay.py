@@ -0,0 +1,30 @@
+import geopandas as gpd
+import numpy as np
+import shapely
+from shapely.geometry import Polygon, box
+
+from ati.mod1Release.praSegmentation import overlayIntersection
+
+
+def test_overlay_intersection_matches_geopandas_overlay():
+    subc = gpd.GeoDataFrame(
+        geometry=[box(0, 0, 50, 100), box(50, 0, 100, 100), box(200, 200, 300, 300)],
+        crs="EPSG:31287",
+    )
+    pra = gpd.GeoDataFrame(
+        geometry=[
+            box(40, 10, 60, 30),  # split by the shared subcatchment edge
+            box(100, 0, 120, 20),  # only touches a subcatchment (line result)
+            box(10, 40, 20, 50).union(box(30, 40, 40, 50)),  # multipolygon
+            box(500, 500, 510, 510),  # outside every subcatchment
+            Polygon([(60, 60), (80, 80), (80, 60), (60, 80)]),  # invalid bow-tie
+        ],
+        crs="EPSG:31287",
+    )
+
+    out = overlayIntersection(pra, subc)
+    expected = gpd.overlay(pra, subc, how="intersection", keep_geom_type=True).explode(index_parts=False)
+
+    assert (shapely.get_type_id(out.geometry.values) == 3).all()
+    assert out.crs == pra.crs
+    np.testing.assert_allclose(np.sort(out.area), np.sort(expected.area))
@@ -0,0 +1,33 @@
+import numpy as np
+
+from ati.mod1Release.praSegmentation import classifyAreasSqm
+
+
+SIZE_CLASSES = {
+    1: (0.0, 500.0),
+    2: (500.0, 2500.0),
+    3: (2500.0, 12500.0),
+    4: (12500.0, 62500.0),
+    5: (62500.0, float("inf")),
+}
+
+
+def test_classify_areas_counts_class_edges_as_lower_bound():
+    areas = [0.0, 499.9, 500.0, 2500.0, 12499.0, 62500.0, 1e9]
+
+    counts = classifyAreasSqm(areas, SIZE_CLASSES)
+
+    assert counts == {1: 2, 2: 1, 3: 2, 4: 0, 5: 2}
+
+
+def test_classify_areas_accepts_ndarray_and_empty_input():
+    areas = np.array([100.0, 600.0, 700.0])
+
+    assert classifyAreasSqm(areas, SIZE_CLASSES) == classifyAreasSqm(areas.tolist(), SIZE_CLASSES)
+    assert classifyAreasSqm(np.array([]), SIZE_CLASSES) == {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
+
+
+def test_classify_areas_handles_gapped_classes():
+    gapped = {1: (0.0, 100.0), 2: (200.0, 300.0)}
+
+    assert classifyAreasSqm([50.0, 150.0, 250.0, 300.0, np.nan], gapped) == {1: 1, 2: 1}
@@ -0,0 +1,54 @@
+import glob
+import os
+
+import geopandas as gpd
+import shapely
+from shapely.geometry import box
+
+from ati.mod0Helper import dataUtils
+from ati.mod0Helper.avaDirectory.avaDirBuildFromFlowPy import (
+    _iter_masks,
+    _praIdKeys,
+    singleAvaPattern,
+    splitGeojsonByPraId,
+)
+
+
+def _masks(targetDir, layout, relPath):
+    res = gpd.GeoDataFrame(
+        {"PRA_id": [1, 2, 3.0], "Sector": ["N", "S", "E"]},
+        geometry=[box(0, 0, 100, 100), box(200, 0, 300, 100), box(400, 0, 500, 100)],
+        crs="EPSG:31287",
+    )
+    os.makedirs(targetDir)
+    splitGeojsonByPraId(res, targetDir, reljsonPath=relPath, layout=layout)
+    maskFiles = sorted(glob.glob(os.path.join(targetDir, singleAvaPattern(layout=layout))))
+    return {
+        name: (sorted(gdf["modType"]), shapely.union_all(gdf.geometry.values))
+        for name, gdf in _iter_masks(maskFiles, layout, None)
+    }
+
+
+def test_single_gpkg_masks_match_files_layout(tmp_path):
+    # release areas (rel) for two of the three PRAs, keyed by PRA_id only
+    rel = gpd.GeoDataFrame(
+        {"PRA_id": [1.0, 3]},
+        geometry=[box(50, 50, 150, 150), box(450, 50, 550, 150)],
+        crs="EPSG:31287",
+    )
+    relPath = str(tmp_path / "rel.geojson")
+    dataUtils.writeGeoData(rel, relPath, driver="GeoJSON")
+
+    files = _masks(str(tmp_path / "files"), "files", relPath)
+    single = _masks(str(tmp_path / "single"), "singleGPKG", relPath)
+
+    assert sorted(files) == sorted(single) == ["praID1", "praID2", "praID3"]
+    assert files["praID1"][0] == ["rel", "res"]
+    for name in files:
+        assert files[name][0] == single[name][0]
+        assert shapely.equals(files[name][1], single[name][1])
+
+
+def test_pra_id_keys_count_mixed_types_once():
+    gdf = gpd.GeoDataFrame({"PraID": [1, 1.0, "1", 2.0, None]}, geometry=[box(0, 0, 1, 1)] * 5)
+    assert _praIdKeys(gdf).nunique() == 2
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+import rasterio
+import shapely
+from rasterio.transform import from_origin
+
+from ati.mod0Helper import dataUtils
+from ati.mod1Release import praSubCatchments
+
+NODATA = -9999
+# label 1: an L-shaped patch, two cells touching it (and each other) only diagonally,
+# and a separate 2x2 patch; label 2: a ring around a nodata cell; label 3: a C around nodata
+LABELS = np.array(
+    [
+        [1, 1, 0, 2, 2, 2],
+        [1, 0, 1, 2, NODATA, 2],
+        [0, 1, 0, 2, 2, 2],
+        [3, 3, 3, 0, 0, 0],
+        [3, NODATA, NODATA, 0, 1, 1],
+        [3, 3, 3, 0, 1, 1],
+    ],
+    dtype=np.int32,
+)
+
+
+def _writeLabels(tifPath):
+    with rasterio.open(
+        tifPath,
+        "w",
+        driver="GTiff",
+        height=LABELS.shape[0],
+        width=LABELS.shape[1],
+        count=1,
+        dtype="int32",
+        crs="EPSG:31287",
+        transform=from_origin(0, 60, 10, 10),
+        nodata=NODATA,
+    ) as dst:
+        dst.write(LABELS, 1)
+
+
+def test_polygonize_raster_patches(tmp_path):
+    tifPath = tmp_path / "labels.tif"
+    _writeLabels(tifPath)
+
+    shpPath = praSubCatchments.polygonizeRaster(tifPath, tmp_path / "rio.shp")
+    gdf = dataUtils.readGeoData(shpPath)
+
+    # 4-connected patches: diagonal neighbours of the same label stay separate
+    assert sorted(gdf["VALUE"].tolist()) == [1, 1, 1, 1, 2, 3]
+    np.testing.assert_array_equal(gdf["FID"].to_numpy(), np.arange(len(gdf)))
+    # zero and nodata cells are not polygonized; the nodata cell is a hole in label 2
+    assert gdf.area.sum() == pytest.approx(np.count_nonzero((LABELS != 0) & (LABELS != NODATA)) * 100)
+    ring = gdf.loc[gdf["VALUE"] == 2, "geometry"].iloc[0]
+    assert len(ring.interiors) == 1
+    assert shapely.is_valid(gdf.geometry.values).all()
+
+
+@pytest.mark.skipif(not praSubCatchments._HAS_WHITEBOX, reason="WhiteboxTools unavailable")
+def test_polygonize_backends_match(tmp_path):
+    tifPath = tmp_path / "labels.tif"
+    _writeLabels(tifPath)
+
+    rio, wbt = (
+        dataUtils.readGeoData(
+            praSubCatchments.vectorizeSubcatchments(
+                "test", tifPath, tmp_path / f"{backend}.shp", polygonizeBackend=backend
+            )
+        )
+        for backend in ("rasterio", "whitebox")
+    )
+
+    assert len(rio) == len(wbt)
+    rio, wbt = rio.sort_values("FID").reset_index(drop=True), wbt.sort_values("FID").reset_index(drop=True)
+    np.testing.assert_array_equal(rio["FID"].to_numpy(), wbt["FID"].to_numpy())
+    np.testing.assert_array_equal(rio["VALUE"].to_numpy(np.int64), wbt["VALUE"].to_numpy(np.int64))
+    diff = shapely.symmetric_difference(rio.geometry.values, wbt.geometry.values)
+    np.testing.assert_allclose(shapely.area(diff), 0.0, atol=1e-6)